@@ -1,12 +1,35 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, send_from_directory
-from collections import defaultdict, Counter
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask import Response, stream_with_context, g, has_request_context, abort, send_file
+from werkzeug.security import safe_join
+from collections import defaultdict, Counter, OrderedDict
+from contextlib import contextmanager, ExitStack
 from datetime import datetime
 from wordcloud import WordCloud
 from textblob import TextBlob
-from langdetect import detect
-from transformers import MarianMTModel, MarianTokenizer
-import os, uuid, re
+from textblob.en import sentiment as textblob_lexicon
+from langdetect import detect_langs, DetectorFactory
+from multiprocessing.connection import Listener, Client
+import click
+import numpy as np
+import os, sys, uuid, re, time
 import unicodedata
+import queue
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import csv
+import base64
+import sqlite3
+import zlib
+import bisect
+import cProfile
+import pstats
+import io
+import math
+import abc
+from functools import lru_cache
+from urllib.parse import quote
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # replace with secure secret in production
@@ -14,10 +37,41 @@ app.secret_key = 'your_secret_key'  # replace with secure secret in production
 # Admin demo credentials
 ADMIN_CREDENTIALS = {'username': 'admin', 'password': 'securepass'}
 
-# Translation model (Hindi/Marathi -> English)
-MODEL_NAME = "Helsinki-NLP/opus-mt-hi-en"
-tokenizer = MarianTokenizer.from_pretrained(MODEL_NAME)
-model = MarianMTModel.from_pretrained(MODEL_NAME)
+# Translation models (regional language -> English), one seq2seq checkpoint per detected
+# language. torch/transformers and the weights are loaded on the first translation that
+# needs them, not at import. With TRANSLATION_SOCKET set, web workers never load them:
+# batches go to one shared `flask translation-server` process.
+TRANSLATION_MODELS = {
+    'hi': "Helsinki-NLP/opus-mt-hi-en",
+    'mr': "Helsinki-NLP/opus-mt-mr-en",
+    'bn': "Helsinki-NLP/opus-mt-bn-en",
+    'ur': "Helsinki-NLP/opus-mt-ur-en",
+    'ml': "Helsinki-NLP/opus-mt-ml-en",
+    'pa': "Helsinki-NLP/opus-mt-pa-en",
+    # multi-source checkpoints: Dravidian and other Indic languages
+    'ta': "Helsinki-NLP/opus-mt-dra-en",
+    'te': "Helsinki-NLP/opus-mt-dra-en",
+    'kn': "Helsinki-NLP/opus-mt-dra-en",
+    'gu': "Helsinki-NLP/opus-mt-inc-en",
+    'ne': "Helsinki-NLP/opus-mt-inc-en",
+}
+# e.g. TRANSLATION_MODELS_OVERRIDE="ta=org/ta-en-model,gu=" (an empty name disables a language)
+for _entry in filter(None, os.environ.get('TRANSLATION_MODELS_OVERRIDE', '').split(',')):
+    _lang, _, _model = _entry.partition('=')
+    TRANSLATION_MODELS[_lang.strip()] = _model.strip()
+TRANSLATION_MODELS = {lang: model for lang, model in TRANSLATION_MODELS.items() if model}
+TRANSLATION_MODEL_MEMORY_MB = int(os.environ.get('TRANSLATION_MODEL_MEMORY_MB', 1024))
+TRANSLATION_PRELOAD = os.environ.get('TRANSLATION_PRELOAD', 'hi')  # languages the server loads at start
+# below this langdetect probability a comment is kept as written ('und') instead of
+# loading a model for a guess, unless every candidate above LANGDETECT_CANDIDATE_FLOOR
+# routes to a model anyway (e.g. mixed Hindi/Marathi), in which case the top one is used
+LANGDETECT_MIN_CONFIDENCE = float(os.environ.get('LANGDETECT_MIN_CONFIDENCE', 0.8))
+LANGDETECT_CANDIDATE_FLOOR = float(os.environ.get('LANGDETECT_CANDIDATE_FLOOR', 0.1))
+TRANSLATION_BATCH_SIZE = int(os.environ.get('TRANSLATION_BATCH_SIZE', 16))
+TRANSLATION_THREADS = int(os.environ.get('TRANSLATION_THREADS', 0))  # 0 = torch default
+TRANSLATION_QUANTIZE = os.environ.get('TRANSLATION_QUANTIZE', '0') == '1'  # dynamic int8 nn.Linear
+TRANSLATION_SOCKET = os.environ.get('TRANSLATION_SOCKET')
+TRANSLATION_AUTHKEY = os.environ.get('TRANSLATION_AUTHKEY', app.secret_key).encode('utf-8')
 
 # Directories for uploaded PDFs and generated wordclouds
 PROPOSAL_DIR = os.path.join("static", "proposals")
@@ -25,6 +79,37 @@ WORDCLOUD_DIR = os.path.join("static", "wordclouds")
 os.makedirs(PROPOSAL_DIR, exist_ok=True)
 os.makedirs(WORDCLOUD_DIR, exist_ok=True)
 
+# Request body limits. werkzeug refuses a body over the limit before parsing it when the
+# length is declared, and stops reading a chunked body once it passes the limit. The
+# default covers ordinary forms; the two upload routes raise it for themselves.
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_REQUEST_KB', 1024)) * 1024
+PROPOSAL_MAX_BYTES = int(os.environ.get('PROPOSAL_MAX_MB', 50)) * 1024 * 1024
+IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_MB', 512)) * 1024 * 1024
+UPLOAD_FORM_OVERHEAD = 64 * 1024  # multipart boundaries and the other form fields
+
+# Flask 3.1 lets a view raise request.max_content_length for its own request; before
+# that the property is read-only, so the same per-request override is added here
+if getattr(app.request_class.max_content_length, 'fset', None) is None:
+    class _Request(app.request_class):
+        _max_content_length = None
+
+        @property
+        def max_content_length(self):
+            if self._max_content_length is not None:
+                return self._max_content_length
+            return super().max_content_length
+
+        @max_content_length.setter
+        def max_content_length(self, value):
+            self._max_content_length = value
+
+    app.request_class = _Request
+
+# Let the reverse proxy send proposal PDFs: '' (Flask sends the bytes), 'x-sendfile'
+# (Apache/lighttpd, absolute path) or 'x-accel' (nginx internal location below).
+PROPOSAL_SENDFILE = os.environ.get('PROPOSAL_SENDFILE', '').lower()
+PROPOSAL_ACCEL_PREFIX = os.environ.get('PROPOSAL_ACCEL_PREFIX', '/_proposals/')
+
 # --- Stopwords and improved tokenization for top-words and wordcloud ---
 EN_STOPWORDS = {
     "the","and","for","that","this","with","are","was","were","is","it","its","of","to","a","an",
@@ -63,20 +148,710 @@ def top_n_words_filtered(text, n=5):
 def safe_filename(s: str) -> str:
     return re.sub(r'[^a-zA-Z0-9_.-]', '_', s)
 
+# --- Latency metrics ---
+# Timing spans around the expensive stages (language detection, translation, sentiment,
+# tokenization and n-grams, controversial phrases, word clouds) feed per-(route, stage)
+# histograms. /metrics serves them in the Prometheus text format together with request
+# latency, translation queue depth and model inference counters. Metrics are kept per
+# process; Prometheus aggregates the workers. Background threads report under their
+# thread name (translator, import-stage, wordcloud) instead of a route.
+METRICS_PREFIX = 'econsultation'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # when set, /metrics needs "Authorization: Bearer <token>"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_TOP_N = 40  # functions listed by ?profile=1
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+_metrics_lock = threading.Lock()
+stage_histograms = defaultdict(LatencyHistogram)  # (route, stage) -> histogram
+request_histograms = defaultdict(LatencyHistogram)  # route -> histogram
+metric_counters = Counter()
+
+def _metrics_route():
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return re.sub(r'[-_]\d+$', '', threading.current_thread().name)
+
+def count_metric(name, n=1):
+    with _metrics_lock:
+        metric_counters[name] += n
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _metrics_lock:
+            stage_histograms[(_metrics_route(), stage)].observe(elapsed)
+        spans = g.get('profile_spans') if has_request_context() else None
+        if spans is not None:
+            spans[stage][0] += 1
+            spans[stage][1] += elapsed
+
+def _prometheus_histogram(lines, name, help_text, histograms, label_names):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, h in sorted(histograms.items()):
+        labels = ','.join(f'{k}="{v}"' for k, v in zip(label_names, key if isinstance(key, tuple) else (key,)))
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS + ('+Inf',), h.buckets):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {h.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {h.count}')
+
+def render_metrics():
+    lines = []
+    with _metrics_lock:
+        _prometheus_histogram(lines, f'{METRICS_PREFIX}_request_seconds', 'Request latency by route.',
+                              request_histograms, ('route',))
+        _prometheus_histogram(lines, f'{METRICS_PREFIX}_stage_seconds', 'Time spent in a processing stage.',
+                              stage_histograms, ('route', 'stage'))
+        counters = sorted(metric_counters.items())
+    for name, value in counters:
+        lines += [f"# TYPE {METRICS_PREFIX}_{name}_total counter", f"{METRICS_PREFIX}_{name}_total {value}"]
+    gauges = [
+        ('translation_queue_depth', 'Comments waiting for a translation worker.', translation_queue.qsize()),
+        ('translation_queue_capacity', 'Bound of the translation queue.', TRANSLATION_QUEUE_SIZE),
+        ('translation_models_loaded', 'Translation models held in this process.', len(translation_models)),
+        ('translation_model_bytes', 'Estimated memory of the loaded translation models.', translation_models.nbytes),
+        ('translation_model_budget_bytes', 'Memory budget of the translation model pool.', translation_models.budget_bytes),
+        ('translation_cache_lru_entries', 'Translations held in the in-memory LRU.', len(translation_cache._lru)),
+    ]
+    for name, help_text, value in gauges:
+        lines += [f"# HELP {METRICS_PREFIX}_{name} {help_text}", f"# TYPE {METRICS_PREFIX}_{name} gauge",
+                  f"{METRICS_PREFIX}_{name} {value}"]
+    for name in ('memory_hits', 'disk_hits', 'misses'):
+        lines += [f"# TYPE {METRICS_PREFIX}_translation_cache_{name}_total counter",
+                  f"{METRICS_PREFIX}_translation_cache_{name}_total {getattr(translation_cache, name)}"]
+    return '\n'.join(lines) + '\n'
+
+# Admins can add ?profile=1 to any page to get a cProfile breakdown of that request
+# (plus the stage spans above) instead of the page itself
+@app.before_request
+def _begin_request_metrics():
+    g.request_start = time.perf_counter()
+    if request.args.get('profile') == '1' and session.get('admin'):
+        g.profile_spans = defaultdict(lambda: [0, 0.0])
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def _profile_report(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    total = time.perf_counter() - g.request_start
+    out = io.StringIO()
+    out.write(f"{request.method} {request.full_path.rstrip('?')} -> {response.status_code} in {total * 1000:.1f} ms\n\n")
+    out.write("Stages (calls, total ms):\n")
+    for stage, (calls, seconds) in sorted(g.profile_spans.items(), key=lambda kv: -kv[1][1]):
+        out.write(f"  {stage:<24s} {calls:6d} {seconds * 1000:10.1f}\n")
+    out.write(f"\ncProfile, top {PROFILE_TOP_N} by cumulative time:\n")
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+    return Response(out.getvalue(), mimetype='text/plain')
+
+# teardown runs after a streamed body has been sent, so this is the full request time
+@app.teardown_request
+def _end_request_metrics(exc):
+    start = g.get('request_start')
+    if start is not None:
+        with _metrics_lock:
+            request_histograms[request.endpoint or 'unknown'].observe(time.perf_counter() - start)
+
+# --- Batched translation ---
+TRANSLATED_LANGS = sorted(TRANSLATION_MODELS)
+UNDETERMINED_LANG = 'und'
+_sentence_split_re = re.compile(r'(?<=[.!?\u0964\u0965])\s+')  # includes Devanagari danda
+
+_inference_lock = threading.Lock()  # one generate() at a time; torch already uses all cores
+
+def translation_model_for(lang_code):
+    return TRANSLATION_MODELS.get(lang_code)
+
+def load_translation_model(model_name):
+    count_metric('translation_model_loads')
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+    if TRANSLATION_THREADS:
+        torch.set_num_threads(TRANSLATION_THREADS)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    if TRANSLATION_QUANTIZE:
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
+
+# Estimated from the state dict; dynamically quantized layers store (weight, bias) tuples
+def model_nbytes(model):
+    total = 0
+    for value in model.state_dict().values():
+        for t in (value if isinstance(value, tuple) else (value,)):
+            if hasattr(t, 'element_size'):
+                total += t.numel() * t.element_size()
+    return total
+
+# Loaded models by checkpoint name, least recently used first. Loading past the memory
+# budget evicts the LRU models (never the one just loaded); a batch still running on an
+# evicted model keeps its reference until it finishes.
+class TranslationModelPool:
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._models = OrderedDict()  # name -> (tokenizer, model, nbytes)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one load at a time; hits don't wait for it
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._models)
+
+    def _lookup(self, name):
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is None:
+                return None
+            self._models.move_to_end(name)
+            return entry[0], entry[1]
+
+    def get(self, name):
+        hit = self._lookup(name)
+        if hit is not None:
+            return hit
+        with self._load_lock:
+            hit = self._lookup(name)
+            if hit is not None:
+                return hit
+            tokenizer, model = load_translation_model(name)
+            nbytes = model_nbytes(model)
+            with self._lock:
+                self._models[name] = (tokenizer, model, nbytes)
+                self.nbytes += nbytes
+                while self.nbytes > self.budget_bytes and len(self._models) > 1:
+                    _, (_, _, freed) = self._models.popitem(last=False)
+                    self.nbytes -= freed
+                    count_metric('translation_model_evictions')
+            return tokenizer, model
+
+    def loaded(self):
+        with self._lock:
+            return {name: entry[2] for name, entry in self._models.items()}
+
+translation_models = TranslationModelPool(TRANSLATION_MODEL_MEMORY_MB * 1024 * 1024)
+
+def split_for_translation(text, tokenizer):
+    # Split into sentences, then cut any sentence still longer than the model limit into
+    # word windows, so nothing is silently dropped by truncation.
+    # leave room for the </s> token; MarianTokenizer reports 512 for opus-mt models
+    limit = min(tokenizer.model_max_length, 512) - 1
+    segments = []
+    for sent in _sentence_split_re.split(text.strip()):
+        sent = sent.strip()
+        if not sent:
+            continue
+        if len(tokenizer.tokenize(sent)) <= limit:
+            segments.append(sent)
+            continue
+        window, window_len = [], 0
+        for word in sent.split():
+            word_len = len(tokenizer.tokenize(word))
+            if window and window_len + word_len > limit:
+                segments.append(' '.join(window))
+                window, window_len = [], 0
+            window.append(word)
+            window_len += word_len
+        if window:
+            segments.append(' '.join(window))
+    return segments
+
+def translate_batch_local(texts, lang_code, batch_size=None):
+    import torch
+    tokenizer, model = translation_models.get(translation_model_for(lang_code))
+    batch_size = batch_size or TRANSLATION_BATCH_SIZE
+    # (text index, segment) pairs, bucketed by token length so padding stays small
+    segments = []
+    for i, text in enumerate(texts):
+        for seg in split_for_translation(text or '', tokenizer):
+            segments.append((i, seg, len(tokenizer.tokenize(seg))))
+    order = sorted(range(len(segments)), key=lambda k: segments[k][2])
+    outputs = [None] * len(segments)
+    with _inference_lock, torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            inputs = tokenizer([segments[k][1] for k in bucket], return_tensors="pt", padding=True, truncation=True)
+            with stage_timer('marian_generate'):
+                generated = model.generate(**inputs)
+            count_metric('model_inference_batches')
+            count_metric('model_inference_segments', len(bucket))
+            for k, out in zip(bucket, tokenizer.batch_decode(generated, skip_special_tokens=True)):
+                outputs[k] = out
+    results = [[] for _ in texts]
+    for (i, _, _), out in zip(segments, outputs):
+        results[i].append(out)
+    return [' '.join(parts) for parts in results]
+
+# --- Shared translation service ---
+# `flask translation-server` holds the model pool and answers
+# (lang_code, texts, batch_size) requests over a Unix socket, routing each to the model
+# its registry has for lang_code; each web worker thread keeps one authenticated
+# connection to it.
+_service_conns = threading.local()
+
+def _translate_remote(texts, lang_code, batch_size):
+    for attempt in range(2):
+        conn = getattr(_service_conns, 'conn', None)
+        try:
+            if conn is None:
+                conn = _service_conns.conn = Client(TRANSLATION_SOCKET, family='AF_UNIX', authkey=TRANSLATION_AUTHKEY)
+            conn.send((lang_code, list(texts), batch_size))
+            status, payload = conn.recv()
+            count_metric('translation_server_requests')
+        except (OSError, EOFError):
+            # server restarted: reconnect once
+            _service_conns.conn = None
+            if attempt:
+                raise
+            continue
+        if status != 'ok':
+            raise RuntimeError(f"translation server: {payload}")
+        return payload
+
+def _serve_translation_connection(conn):
+    with conn:
+        while True:
+            try:
+                lang_code, texts, batch_size = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                conn.send(('ok', translate_batch_local(texts, lang_code, batch_size)))
+            except Exception as e:
+                conn.send(('error', str(e)))
+
+def serve_translations(address):
+    for lang_code in filter(None, TRANSLATION_PRELOAD.split(',')):
+        if translation_model_for(lang_code.strip()):
+            translation_models.get(translation_model_for(lang_code.strip()))
+    if os.path.exists(address):
+        os.remove(address)
+    listener = Listener(address, family='AF_UNIX', authkey=TRANSLATION_AUTHKEY)
+    print(f"Translation server ({len(set(TRANSLATION_MODELS.values()))} models, "
+          f"{TRANSLATION_MODEL_MEMORY_MB} MB budget) listening on {address}")
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:  # e.g. a client with the wrong authkey
+            print("Translation server: rejected connection:", e)
+            continue
+        threading.Thread(target=_serve_translation_connection, args=(conn,), name='translation-server',
+                         daemon=True).start()
+
+@app.cli.command('translation-server')
+@click.option('--socket', 'address', default=None, help='Unix socket path (defaults to $TRANSLATION_SOCKET).')
+def translation_server_command(address):
+    """Run the shared translation model process for the web workers."""
+    address = address or TRANSLATION_SOCKET
+    if not address:
+        raise click.UsageError('pass --socket or set TRANSLATION_SOCKET')
+    serve_translations(address)
+
+def translate_batch(texts, lang_code, batch_size=None):
+    if translation_model_for(lang_code) is None or not texts:
+        return list(texts)
+    with stage_timer('translate'):
+        if TRANSLATION_SOCKET:
+            return _translate_remote(texts, lang_code, batch_size)
+        return translate_batch_local(texts, lang_code, batch_size)
+
 def translate_to_english(text, lang_code):
-    if lang_code in ['hi', 'mr']:
-        inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
-        translated = model.generate(**inputs)
-        return tokenizer.decode(translated[0], skip_special_tokens=True)
-    return text
+    return translate_batch([text], lang_code)[0]
+
+# --- Persistent translation / language-detection cache ---
+# Content-addressed: the key is a hash of the namespace plus the normalized text, so
+# copy-pasted campaign comments are detected and translated only once. A bounded
+# in-memory LRU sits in front of the SQLite file. Each entry records the model that
+# produced it; an entry whose language is now routed to a different model (or newly
+# gets one) is a miss and is detected and translated again.
+CACHE_DIR = os.environ.get('CACHE_DIR', 'cache')
+TRANSLATION_CACHE_PATH = os.path.join(CACHE_DIR, 'translations.sqlite3')
+TRANSLATION_CACHE_LRU_SIZE = int(os.environ.get('TRANSLATION_CACHE_LRU_SIZE', 10000))
+# the key prefix from when hi and mr shared one model; kept so existing entries stay valid
+TRANSLATION_CACHE_NAMESPACE = "Helsinki-NLP/opus-mt-hi-en"
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+def normalize_for_cache(text):
+    text = unicodedata.normalize('NFKC', text or '')
+    return ' '.join(text.split())
+
+class TranslationCache:
+    def __init__(self, path, lru_size, namespace):
+        self.namespace = namespace
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # same settings as SQLiteStorage: WAL, and fsync at checkpoints rather than per commit
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS translations "
+                         "(key TEXT PRIMARY KEY, lang TEXT NOT NULL, translation TEXT NOT NULL, model TEXT)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(translations)")}
+        if 'model' not in columns:
+            self._db.execute("ALTER TABLE translations ADD COLUMN model TEXT")
+        self._db.commit()
+        self.memory_hits = self.disk_hits = self.misses = 0
+
+    def key(self, text):
+        payload = f"{self.namespace}\0{normalize_for_cache(text)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # rows written before the model column came from the namespace model (hi and mr only);
+    # 'und' rows from older releases are detected again
+    def _current(self, lang, model):
+        if lang == UNDETERMINED_LANG:
+            return False
+        if model is None:
+            model = self.namespace if lang in ('hi', 'mr') else ''
+        return model == (translation_model_for(lang) or '')
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    # Returns (lang, translation) or None
+    def get(self, text):
+        key = self.key(text)
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            row = self._db.execute("SELECT lang, translation, model FROM translations WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None or not self._current(row[0], row[2]):
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            value = (row[0], row[1])
+            self._remember(key, value)
+            return value
+
+    def put(self, text, lang, translation):
+        self.put_many([(text, lang, translation)])
+
+    # Takes (text, lang, translation) triples and writes them in one transaction
+    def put_many(self, entries):
+        rows = [(self.key(text), lang, translation, translation_model_for(lang) or '')
+                for text, lang, translation in entries]
+        with self._lock:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO translations (key, lang, translation, model) "
+                                     "VALUES (?, ?, ?, ?)", rows)
+            for key, lang, translation, _ in rows:
+                self._remember(key, (lang, translation))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            entries = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'lru_entries': len(self._lru),
+                'disk_entries': entries,
+            }
+
+translation_cache = TranslationCache(TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_LRU_SIZE, TRANSLATION_CACHE_NAMESPACE)
+
+# --- Background translation workers ---
+# Comments are stored immediately with translation_status 'pending' and translated
+# off the request thread. The queue is bounded: when it is full, submitters wait up to
+# TRANSLATION_ENQUEUE_TIMEOUT seconds and then leave the comment pending so a later
+# page view can re-queue it. A comment is claimed in storage ('queued') before it is
+# queued, so only one worker process translates it; claims older than
+# TRANSLATION_CLAIM_TIMEOUT (e.g. from a crashed process) are picked up again.
+# A comment whose translation raises goes back to 'pending' and is not picked up again
+# for TRANSLATION_RETRY_BACKOFF seconds, doubling per attempt; it is kept untranslated
+# ('failed') only after TRANSLATION_MAX_ATTEMPTS attempts.
+TRANSLATION_WORKERS = int(os.environ.get('TRANSLATION_WORKERS', 2))
+TRANSLATION_QUEUE_SIZE = int(os.environ.get('TRANSLATION_QUEUE_SIZE', 1000))
+TRANSLATION_ENQUEUE_TIMEOUT = float(os.environ.get('TRANSLATION_ENQUEUE_TIMEOUT', 0.5))
+TRANSLATION_CLAIM_TIMEOUT = float(os.environ.get('TRANSLATION_CLAIM_TIMEOUT', 300))
+TRANSLATION_MAX_ATTEMPTS = int(os.environ.get('TRANSLATION_MAX_ATTEMPTS', 5))
+TRANSLATION_RETRY_BACKOFF = float(os.environ.get('TRANSLATION_RETRY_BACKOFF', 30))
+
+translation_queue = queue.Queue(maxsize=TRANSLATION_QUEUE_SIZE)
+_translation_threads = []
+_translation_lock = threading.Lock()
+
+# langdetect loads its profiles lazily into a shared factory, which is not thread-safe
+_detect_lock = threading.Lock()
+DetectorFactory.seed = 0  # langdetect samples randomly; seeded, a text always gets the same answer
+
+# Returns (lang_code, confident); only confident detections are worth caching
+def detect_language_with_confidence(text):
+    try:
+        with stage_timer('langdetect'), _detect_lock:
+            candidates = detect_langs(text)
+    except Exception:
+        return 'en', False
+    best = candidates[0]
+    if best.prob >= LANGDETECT_MIN_CONFIDENCE or not translation_model_for(best.lang):
+        return best.lang, best.prob >= LANGDETECT_MIN_CONFIDENCE
+    count_metric('langdetect_low_confidence')
+    if all(translation_model_for(c.lang) for c in candidates if c.prob >= LANGDETECT_CANDIDATE_FLOOR):
+        return best.lang, False
+    return UNDETERMINED_LANG, False
+
+def detect_language(text):
+    return detect_language_with_confidence(text)[0]
+
+def translation_ready(comment):
+    return comment.get('translation_status', 'done') in ('done', 'failed')
+
+# Queue items are (proposal_id, comment) pairs
+def _drain_translation_batch():
+    # block for the first comment, then take whatever else is already queued
+    batch = [translation_queue.get()]
+    while len(batch) < TRANSLATION_BATCH_SIZE:
+        try:
+            batch.append(translation_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+# Returns (lang_code, cached english or None, confident) per text; cached texts skip
+# langdetect
+def detect_texts(texts):
+    detected = []
+    for text in texts:
+        hit = translation_cache.get(text)
+        if hit is not None:
+            detected.append((*hit, True))
+        else:
+            lang_code, confident = detect_language_with_confidence(text)
+            detected.append((lang_code, None, confident))
+    return detected
+
+# Fills in the translations detect_texts() could not find in the cache; identical
+# texts are translated once per call, and languages routed to the same model share
+# its batches. Only confident detections are cached: a guess (or 'und') is detected
+# again next time instead of sticking to every copy of the text.
+def translate_detected(texts, detected):
+    results = [(lang_code, english) for lang_code, english, _ in detected]
+    misses = defaultdict(list)  # (lang, normalized text) -> indices
+    for i, (lang_code, english, _) in enumerate(detected):
+        if english is None:
+            misses[(lang_code, normalize_for_cache(texts[i]))].append(i)
+    by_model = defaultdict(list)
+    for (lang_code, _), idxs in misses.items():
+        by_model[translation_model_for(lang_code)].append((lang_code, idxs))
+    fresh = []
+    for groups in by_model.values():
+        # any of the group's languages routes to the same model
+        translated = translate_batch([texts[idxs[0]] for _, idxs in groups], groups[0][0])
+        for (lang_code, idxs), out in zip(groups, translated):
+            if detected[idxs[0]][2] and lang_code != UNDETERMINED_LANG:
+                fresh.append((texts[idxs[0]], lang_code, out))
+            for i in idxs:
+                results[i] = (lang_code, out)
+    if fresh:
+        translation_cache.put_many(fresh)
+    return results
+
+# Returns (lang_code, english) per text
+def translate_texts(texts):
+    return translate_detected(texts, detect_texts(texts))
+
+# Returns (lang_code, english) or None per text; after a failed batch each text is
+# tried on its own, so one bad text does not hold back the others
+def _translate_or_none(texts):
+    try:
+        return translate_texts(texts)
+    except Exception as e:
+        print("Translation error:", e)
+    results = []
+    for text in texts:
+        try:
+            results.append(translate_texts([text])[0])
+        except Exception:
+            results.append(None)
+    return results
+
+# Translates and stores claimed comments; failed ones are deferred or, after their
+# last attempt, stored untranslated
+def translate_claimed(comments):
+    ready = []
+    for comment, translated in zip(comments, _translate_or_none([c['original'] for c in comments])):
+        attempts = comment.get('translation_attempts', 0) + 1
+        if translated is not None:
+            comment['lang'], comment['text'] = translated
+            comment['translation_status'] = 'done'
+        elif attempts < TRANSLATION_MAX_ATTEMPTS:
+            try:
+                storage.defer_translation(comment['id'], time.time() + TRANSLATION_RETRY_BACKOFF * 2 ** (attempts - 1))
+            except Exception as e:
+                print("Storage error:", e)
+            continue
+        else:
+            comment['text'] = comment['original']
+            comment['translation_status'] = 'failed'
+        ready.append(comment)
+    try:
+        # score once here; every process's analytics load the stored features
+        for comment, features in zip(ready, comment_features_batch(ready)):
+            comment['features'] = features
+        storage.complete_translations(ready)
+    except Exception as e:
+        print("Storage error:", e)
+
+def _translation_worker():
+    while True:
+        batch = _drain_translation_batch()
+        translate_claimed([c for _, c in batch])
+        for _ in batch:
+            translation_queue.task_done()
+
+def start_translation_workers():
+    with _translation_lock:
+        while len(_translation_threads) < TRANSLATION_WORKERS:
+            t = threading.Thread(target=_translation_worker, name=f"translator-{len(_translation_threads)}", daemon=True)
+            t.start()
+            _translation_threads.append(t)
+
+# Returns False when the queue stayed full; the comment is then left 'pending'
+def enqueue_translation(proposal_id, comment, block=True):
+    start_translation_workers()
+    if not storage.claim_for_translation(comment['id'], TRANSLATION_CLAIM_TIMEOUT):
+        return True  # already done, or queued by another worker
+    comment['translation_status'] = 'queued'
+    try:
+        translation_queue.put((proposal_id, comment), block=block, timeout=TRANSLATION_ENQUEUE_TIMEOUT if block else None)
+    except queue.Full:
+        storage.release_translation_claim(comment['id'])
+        comment['translation_status'] = 'pending'
+        return False
+    return True
+
+def enqueue_pending_translations(proposal_id):
+    free = TRANSLATION_QUEUE_SIZE - translation_queue.qsize()
+    if free <= 0:
+        return
+    for c in storage.pending_comments(proposal_id, free, TRANSLATION_CLAIM_TIMEOUT):
+        if not enqueue_translation(proposal_id, c, block=False):
+            break
+
+# --- Sentiment scoring ---
+# Backends map a list of texts to a polarity array in [-1, 1]. 'textblob' is the
+# reference; 'lexicon' averages TextBlob's own word polarities over the tokens from
+# tokenize_filtered with NumPy, without building a TextBlob (and its POS parse) per text.
+SENTIMENT_BACKEND = os.environ.get('SENTIMENT_BACKEND', 'textblob')
+SENTIMENT_POSITIVE_THRESHOLD = float(os.environ.get('SENTIMENT_POSITIVE_THRESHOLD', 0.1))
+SENTIMENT_NEGATIVE_THRESHOLD = float(os.environ.get('SENTIMENT_NEGATIVE_THRESHOLD', -0.1))
+SENTIMENT_LABELS = ('positive', 'neutral', 'negative')
 
-def analyze_sentiment(text):
-    polarity = TextBlob(text).sentiment.polarity
-    if polarity > 0.1:
-        return 'positive'
-    if polarity < -0.1:
-        return 'negative'
-    return 'neutral'
+def textblob_polarities(texts):
+    return np.array([TextBlob(t or '').sentiment.polarity for t in texts], dtype=np.float64)
+
+_raw_word_re = re.compile(r"[a-z]+(?=n't)|n't|[a-z]+")  # "don't" -> "do", "n't" as TextBlob splits it
+
+class LexiconSentiment:
+    def __init__(self):
+        self.vocab = {}
+        polarities = []
+        for word, senses in textblob_lexicon.items():
+            # the None sense is TextBlob's average over all parts of speech
+            values = senses.get(None) or next(iter(senses.values()))
+            self.vocab[word.lower()] = len(polarities)
+            polarities.append(values[0])
+        self.polarity = np.array(polarities, dtype=np.float64)
+
+    # Negations are found on the raw words, before the stopword filter drops them. As in
+    # TextBlob, one flips the next scored word at half strength ("not good" is -0.35) and
+    # carries over single letters only ("not a good plan")
+    def score(self, texts):
+        doc_ids, word_ids, weights = [], [], []
+        for i, text in enumerate(texts):
+            negated = False
+            for tok in _raw_word_re.findall(re.sub(r"[^a-z'\s]", ' ', (text or '').lower())):
+                j = self.vocab.get(tok) if len(tok) >= 3 and tok not in STOPWORDS else None
+                if j is not None:
+                    doc_ids.append(i)
+                    word_ids.append(j)
+                    weights.append(-0.5 if negated else 1.0)
+                negated = tok in textblob_lexicon.negations or (negated and j is None and len(tok) == 1)
+        doc_ids = np.asarray(doc_ids, dtype=np.intp)
+        word_ids = np.asarray(word_ids, dtype=np.intp)
+        sums = np.bincount(doc_ids, weights=self.polarity[word_ids] * weights, minlength=len(texts))
+        counts = np.bincount(doc_ids, minlength=len(texts))
+        return np.divide(sums, counts, out=np.zeros(len(texts)), where=counts > 0)
+
+_lexicon_sentiment = None
+_lexicon_lock = threading.Lock()
+
+def lexicon_polarities(texts):
+    global _lexicon_sentiment
+    with _lexicon_lock:
+        if _lexicon_sentiment is None:
+            _lexicon_sentiment = LexiconSentiment()
+    return _lexicon_sentiment.score(texts)
+
+SENTIMENT_BACKENDS = {'textblob': textblob_polarities, 'lexicon': lexicon_polarities}
+
+def sentiment_polarities(texts, backend=None):
+    backend = backend or SENTIMENT_BACKEND
+    with stage_timer(f'sentiment_{backend}'):
+        return SENTIMENT_BACKENDS[backend](list(texts))
+
+def label_polarities(polarities, positive=None, negative=None):
+    positive = SENTIMENT_POSITIVE_THRESHOLD if positive is None else positive
+    negative = SENTIMENT_NEGATIVE_THRESHOLD if negative is None else negative
+    polarities = np.asarray(polarities)
+    labels = np.where(polarities > positive, 'positive', np.where(polarities < negative, 'negative', 'neutral'))
+    return labels.tolist()
+
+def analyze_sentiment(text, backend=None):
+    return label_polarities(sentiment_polarities([text], backend))[0]
+
+def sentiment_agreement_report(texts, backends=('textblob', 'lexicon')):
+    texts = list(texts)
+    reference, candidate = backends
+    timings, scores = {}, {}
+    for name in backends:
+        start = time.perf_counter()
+        scores[name] = sentiment_polarities(texts, name)
+        timings[name] = time.perf_counter() - start
+    ref_labels, cand_labels = label_polarities(scores[reference]), label_polarities(scores[candidate])
+    confusion = {a: {b: 0 for b in SENTIMENT_LABELS} for a in SENTIMENT_LABELS}
+    for a, b in zip(ref_labels, cand_labels):
+        confusion[a][b] += 1
+    n = len(texts)
+    agree = sum(confusion[l][l] for l in SENTIMENT_LABELS)
+    diff = scores[reference] - scores[candidate]
+    return {
+        'n': n,
+        'reference': reference,
+        'candidate': candidate,
+        'label_agreement': round(agree / n, 4) if n else 1.0,
+        'polarity_mae': round(float(np.abs(diff).mean()), 4) if n else 0.0,
+        'confusion': confusion,  # reference label -> candidate label -> count
+        'seconds': {k: round(v, 4) for k, v in timings.items()},
+    }
 
 # Heuristic summarizer focused on suggestions/changes
 SUGGESTION_KEYWORDS = {
@@ -114,10 +889,13 @@ def valid_token_for_ngrams(tok):
         return False
     return tok.isalpha()
 
-def extract_ngrams_from_text(text, min_n=2, max_n=5):
+def phrase_tokens(text):
     t = _normalize_text_for_ngrams(text).lower()
     t_clean = re.sub(r'[^a-z\s]', ' ', t)
-    toks = [tok for tok in t_clean.split() if valid_token_for_ngrams(tok)]
+    return [tok for tok in t_clean.split() if valid_token_for_ngrams(tok)]
+
+def extract_ngrams_from_text(text, min_n=2, max_n=5):
+    toks = phrase_tokens(text)
     ngrams = []
     l = len(toks)
     for n in range(min_n, min(max_n, l) + 1):
@@ -134,20 +912,753 @@ def is_reasonable_quote(q):
         return False
     return any(len(t) >= 4 for t in toks)
 
-# --- In-memory storage ---
-proposals_db = {}
-comments_db = defaultdict(list)
+# --- Streaming phrase counting ---
+# Phrase (2-4 gram) frequencies live in a count-min sketch instead of a Counter holding
+# every n-gram string. Tokens map to stable 64-bit ids (memoized) and n-grams to rolling
+# hashes of those ids. Only the current heavy hitters keep their text: each is counted
+# exactly from the moment it is tracked, together with the number of positive and
+# negative comments containing it, and carries the sketch's overcount at that moment as
+# its error. A sketch estimate never undercounts and overcounts by at most
+# e/width * total with probability 1 - e^-depth. Removals (deleted comments) subtract,
+# and summaries merge, so proposals or workers can be combined.
+# Two more sketches count the positive and negative comments containing each phrase, so
+# a phrase pruned from the tracked set and admitted again starts from (over)estimates
+# of its earlier comments rather than from zero: controversial() can report a phrase
+# whose sides collide with other phrases, but never misses a tracked one.
+# Sketches are sized to the phrases counted (about one cell per n-gram), up to
+# PHRASE_SKETCH_MEMORY_MB for the three together.
+PHRASE_MIN_N, PHRASE_MAX_N = 2, 4
+PHRASE_SKETCH_DEPTH = 4
+PHRASE_SKETCH_MEMORY_MB = float(os.environ.get('PHRASE_SKETCH_MEMORY_MB', 4))  # per proposal, at most
+PHRASE_SKETCH_MIN_WIDTH = 1024
+PHRASE_TOPK_CAPACITY = int(os.environ.get('PHRASE_TOPK_CAPACITY', 1000))  # phrases whose text is kept
+_PHRASE_HASH_BASE = np.uint64(0x100000001B3)
+
+@lru_cache(maxsize=200000)
+def token_id(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+# Returns (hashes, lengths, starts) for every n-gram of the token list, in
+# extract_ngrams_from_text order
+def phrase_hashes(tokens, min_n=PHRASE_MIN_N, max_n=PHRASE_MAX_N):
+    ids = np.fromiter((token_id(t) for t in tokens), dtype=np.uint64, count=len(tokens))
+    h = ids
+    hashes, lengths, starts = [], [], []
+    for n in range(1, max_n + 1):
+        if n > 1:
+            h = h[:-1] * _PHRASE_HASH_BASE + ids[n - 1:]
+        if n >= min_n and len(h):
+            hashes.append(h)
+            lengths.append(np.full(len(h), n))
+            starts.append(np.arange(len(h)))
+    if not hashes:
+        empty = np.empty(0, dtype=np.int64)
+        return np.empty(0, dtype=np.uint64), empty, empty
+    return np.concatenate(hashes), np.concatenate(lengths), np.concatenate(starts)
+
+class CountMinSketch:
+    def __init__(self, width, depth=PHRASE_SKETCH_DEPTH, seed=20250701):
+        assert width & (width - 1) == 0, "width must be a power of two"
+        self.width, self.depth = width, depth
+        self.shift = np.uint64(64 - (width.bit_length() - 1))
+        # odd multipliers for multiply-shift hashing; fixed so sketches stay mergeable
+        self.mult = np.random.default_rng(seed).integers(0, 2**63, size=depth, dtype=np.uint64) | np.uint64(1)
+        self.table = np.zeros((depth, width), dtype=np.int32)
+        self.total = 0
+
+    def _index(self, hashes):
+        return (self.mult[:, None] * hashes[None, :]) >> self.shift
+
+    def add(self, hashes, count=1):
+        # one scatter-add over the flattened table, row r offset by r * width
+        flat = self._index(hashes).astype(np.intp) + (np.arange(self.depth) * self.width)[:, None]
+        np.add.at(self.table.reshape(-1), flat.ravel(), count)
+        self.total += count * len(hashes)
+
+    def estimate(self, hashes):
+        return self.table[np.arange(self.depth)[:, None], self._index(hashes)].min(axis=0)
+
+    def error_bound(self):
+        return math.e / self.width * self.total
+
+    # A multiply-shift index at width w/2 is the index at width w without its low bit,
+    # so halving the width adds neighbouring cells and estimates stay upper bounds
+    def fold(self, width):
+        if width < self.width:
+            self.table = self.table.reshape(self.depth, width, -1).sum(axis=2, dtype=np.int32)
+            self.shift += np.uint64((self.width // width).bit_length() - 1)
+            self.width = width
+
+    # the wider sketch is folded to the narrower one's width; an empty one takes the other's
+    def merge(self, other):
+        if self.depth != other.depth or not np.array_equal(self.mult, other.mult):
+            raise ValueError("sketches differ in hashing")
+        if other.width > self.width and not self.total and not self.table.any():
+            self.table, self.width, self.shift = np.zeros_like(other.table), other.width, other.shift
+        self.fold(other.width)
+        table = other.table
+        if other.width > self.width:
+            table = table.reshape(self.depth, self.width, -1).sum(axis=2, dtype=np.int32)
+        self.table += table
+        self.total += other.total
+
+# Power-of-two width for `total` counted n-grams; None gives the largest width allowed
+def phrase_sketch_width(total, memory_mb=PHRASE_SKETCH_MEMORY_MB):
+    largest = 2 ** max(int(math.log2(memory_mb * 2**20 / (3 * PHRASE_SKETCH_DEPTH * 4))), 4)
+    if total is None:
+        return largest
+    return min(max(PHRASE_SKETCH_MIN_WIDTH, 1 << (max(int(total), 1) - 1).bit_length()), largest)
+
+class PhraseSummary:
+    # expected: n-grams the sketches are sized for; None starts at the largest width, to
+    # be folded down by fit() once the phrases are counted
+    def __init__(self, expected=None, memory_mb=PHRASE_SKETCH_MEMORY_MB, capacity=PHRASE_TOPK_CAPACITY):
+        self.memory_mb = memory_mb
+        width = phrase_sketch_width(expected, memory_mb)
+        self.counts = CountMinSketch(width)  # occurrences
+        self.positive = CountMinSketch(width)  # positive comments containing the phrase
+        self.negative = CountMinSketch(width)
+        self.capacity = capacity
+        # phrase hash -> [text, count since tracked, error, positive comments, negative comments]
+        self.tracked = {}
+        self.admit_at = 0  # estimate a phrase needs once the tracked set has been pruned
+
+    def update(self, tokens, sentiment, sign=1):
+        hashes, lengths, starts = phrase_hashes(tokens)
+        if not len(hashes):
+            return
+        self.counts.add(hashes, sign)
+        unique, first, occurrences = np.unique(hashes, return_index=True, return_counts=True)
+        order = np.argsort(first)  # first-occurrence order, so ties rank like a Counter
+        pos, neg = int(sentiment == 'positive'), int(sentiment == 'negative')
+        if pos or neg:
+            (self.positive if pos else self.negative).add(unique, sign)
+        tracked = self.tracked
+        if sign < 0:
+            for h, n in zip(unique.tolist(), occurrences.tolist()):
+                entry = tracked.get(h)
+                if entry is None:
+                    continue
+                entry[1] -= n
+                entry[3] = max(entry[3] - pos, 0)
+                entry[4] = max(entry[4] - neg, 0)
+                if entry[1] < 0:  # removed occurrences were counted before tracking began
+                    entry[2] = max(entry[2] + entry[1], 0)
+                    entry[1] = 0
+            return
+        estimates = self.counts.estimate(unique).tolist()
+        first, occurrences = first.tolist(), occurrences.tolist()
+        admitted = []
+        for k, h in zip(order.tolist(), unique[order].tolist()):
+            entry = tracked.get(h)
+            if entry is not None:
+                entry[1] += occurrences[k]
+                entry[3] += pos
+                entry[4] += neg
+            elif estimates[k] >= self.admit_at:
+                j = first[k]
+                tracked[h] = [' '.join(tokens[starts[j]:starts[j] + lengths[j]]), occurrences[k],
+                              estimates[k] - occurrences[k], pos, neg]
+                admitted.append(h)
+        if admitted and self.admit_at:  # once pruned, a new entry may have been tracked before
+            admitted_hashes = np.array(admitted, dtype=np.uint64)
+            for h, p, n in zip(admitted, self.positive.estimate(admitted_hashes).tolist(),
+                               self.negative.estimate(admitted_hashes).tolist()):
+                tracked[h][3], tracked[h][4] = p, n
+        if len(tracked) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        items = list(self.tracked.items())
+        estimates = np.array([e[1] + e[2] for _, e in items])
+        keep = np.sort(np.argsort(-estimates, kind='stable')[:self.capacity])
+        self.admit_at = max(int(estimates[keep].min()), 1)
+        self.tracked = {items[k][0]: items[k][1] for k in keep}
+
+    # [(phrase, estimated count)], most frequent first; the estimate exceeds the true
+    # count by at most the phrase's error (and never by more than error_bound())
+    def top(self, k, min_count=1):
+        ranked = sorted(((e[0], e[1] + e[2]) for e in self.tracked.values()), key=lambda x: -x[1])
+        return [(p, n) for p, n in ranked if n >= min_count][:k]
+
+    def error_bound(self):
+        return math.ceil(self.counts.error_bound())
+
+    # folds the sketches down to the width the counted n-grams need, e.g. after a replay
+    def fit(self):
+        width = phrase_sketch_width(self.counts.total, self.memory_mb)
+        for sketch in (self.counts, self.positive, self.negative):
+            sketch.fold(width)
+
+    # more than two n-grams per cell, with room left to grow
+    def outgrown(self):
+        return self.counts.total > 2 * self.counts.width and self.counts.width < phrase_sketch_width(None, self.memory_mb)
+
+    # tracked phrases seen at least min_freq times, in both a positive and a negative comment
+    def controversial(self, min_freq):
+        return [e[0] for e in self.tracked.values() if e[1] + e[2] >= min_freq and e[3] > 0 and e[4] > 0]
+
+    # Top phrases over several summaries (e.g. one per proposal) and their error bound. A
+    # summary contributes its tracked count (plus error) for a phrase, or its own sketch
+    # estimate where it does not track it, so each overcount stays within that summary's
+    # bound however small its sketch is.
+    @staticmethod
+    def combine(summaries, k, min_count=1):
+        phrases = {}
+        for summary in summaries:
+            for h, entry in summary.tracked.items():
+                phrases.setdefault(h, entry[0])
+        hashes = np.array(list(phrases), dtype=np.uint64)
+        totals = np.zeros(len(hashes), dtype=np.int64)
+        for summary in summaries:
+            if len(hashes):
+                counts = summary.counts.estimate(hashes).astype(np.int64)
+                for i, h in enumerate(phrases):
+                    entry = summary.tracked.get(h)
+                    if entry is not None:
+                        counts[i] = entry[1] + entry[2]
+                totals += counts
+        ranked = sorted(zip(phrases.values(), totals.tolist()), key=lambda x: -x[1])
+        return [(p, n) for p, n in ranked if n >= min_count][:k], sum(s.error_bound() for s in summaries)
+
+    # Folds into this summary; sketches of different widths merge at the narrower one,
+    # so combine() is more accurate for summaries sized for different counts
+    def merge(self, other):
+        # a phrase tracked on one side only may have untracked occurrences on the other;
+        # that side's sketch estimate is added to its error
+        only_here = [h for h in self.tracked if h not in other.tracked]
+        only_there = [h for h in other.tracked if h not in self.tracked]
+        for h, n in zip(only_here, other.counts.estimate(np.array(only_here, dtype=np.uint64)).tolist()):
+            self.tracked[h][2] += n
+        for h, n in zip(only_there, self.counts.estimate(np.array(only_there, dtype=np.uint64)).tolist()):
+            text, count, error, positive, negative = other.tracked[h]
+            self.tracked[h] = [text, count, error + n, positive, negative]
+        for h, entry in other.tracked.items():
+            if h not in only_there:
+                mine = self.tracked[h]
+                for i in range(1, 5):
+                    mine[i] += entry[i]
+        for mine, theirs in ((self.counts, other.counts), (self.positive, other.positive),
+                             (self.negative, other.negative)):
+            mine.merge(theirs)
+        self.admit_at = max(self.admit_at, other.admit_at)
+        if len(self.tracked) > 2 * self.capacity:
+            self._prune()
+
+# --- Storage ---
+# Proposals and comments live in SQLite (WAL mode) so several gunicorn workers share
+# them. Every comment that becomes ready (translated) or is deleted is appended to
+# comment_log; each process keeps its analytics current by replaying the log from
+# the last sequence number it has seen. A delete entry keeps the comment's text and
+# features, so a process replaying it can subtract them after the row is gone.
+DATA_DIR = os.environ.get('DATA_DIR', 'data')
+DATABASE_PATH = os.path.join(DATA_DIR, 'econsultation.sqlite3')
+os.makedirs(DATA_DIR, exist_ok=True)
+
+COMMENT_FIELDS = ('id', 'name', 'profession', 'original', 'text', 'lang', 'date', 'translation_status', 'sentiment',
+                  'cluster_id', 'translation_attempts')
+
+# Backend interface; a backend missing any of these methods fails when instantiated
+class Storage(abc.ABC):
+    @abc.abstractmethod
+    def get_proposal(self, proposal_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_proposals(self):
+        raise NotImplementedError
+
+    # With or_ignore an existing id is left alone; returns whether the proposal was added
+    @abc.abstractmethod
+    def add_proposal(self, proposal, or_ignore=False):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_comment(self, proposal_id, comment_id):
+        raise NotImplementedError
+
+    # Comments ordered by (date, id); `after` is the (date, id) of the last comment
+    # already shown. Filters on sentiment/profession use indexes, not Python scans.
+    # collapse keeps only the earliest comment of each near-duplicate cluster
+    @abc.abstractmethod
+    def list_comments(self, proposal_id, after=None, limit=None, sentiment=None, profession=None,
+                      cluster=None, collapse=False):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_comments(self, proposal_id, comments):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_professions(self, proposal_id):
+        raise NotImplementedError
+
+    def add_comment(self, proposal_id, comment):
+        self.add_comments(proposal_id, [comment])
+
+    @abc.abstractmethod
+    def delete_comment(self, proposal_id, comment_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def pending_comments(self, proposal_id, limit, claim_timeout):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count_pending(self, proposal_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def claim_for_translation(self, comment_id, claim_timeout):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def release_translation_claim(self, comment_id):
+        raise NotImplementedError
+
+    # Back to 'pending' after a failed attempt, not claimable again before retry_at
+    @abc.abstractmethod
+    def defer_translation(self, comment_id, retry_at):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def complete_translations(self, comments):
+        raise NotImplementedError
+
+    # Returns [(seq, op, comment_id, comment)] after `seq`; comment is None for
+    # comments deleted since they became ready. For deletes it holds the text and
+    # features the comment had when it was deleted. At most `limit` entries, oldest first.
+    @abc.abstractmethod
+    def changes_since(self, proposal_id, seq, limit=None):
+        raise NotImplementedError
+
+    # Ready comments (text, features, ...) by id, in the form changes_since returns them
+    @abc.abstractmethod
+    def comments_by_id(self, proposal_id, comment_ids):
+        raise NotImplementedError
+
+    # Yields (comment_id, text) for every ready comment of the proposal
+    @abc.abstractmethod
+    def iter_comment_texts(self, proposal_id):
+        raise NotImplementedError
+
+    # Returns [(seq, cluster_id, minhash)] for clusters created after `seq`
+    @abc.abstractmethod
+    def cluster_signatures(self, proposal_id, seq=0):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def unclustered_comments(self, proposal_id, limit):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_clusters(self, proposal_id, comments):
+        raise NotImplementedError
+
+    # A translated member of the cluster (text, lang, features), or None
+    @abc.abstractmethod
+    def cluster_translation(self, proposal_id, cluster_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cluster_sizes(self, proposal_id, cluster_ids):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_import_job(self, job_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_import_jobs(self, limit=20):
+        raise NotImplementedError
+
+    # Returns the job, or None while another run holds it (updated within claim_timeout)
+    @abc.abstractmethod
+    def start_import_job(self, job_id, proposal_id, source, claim_timeout):
+        raise NotImplementedError
+
+    # Inserts a chunk of imported comments and advances the job's row counters atomically;
+    # returns how many comments were inserted
+    @abc.abstractmethod
+    def record_import_chunk(self, job_id, proposal_id, comments, rows_done, skipped=0):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def finish_import_job(self, job_id, status, error=None):
+        raise NotImplementedError
+
+def _features_to_json(f):
+    return json.dumps({k: v for k, v in f.items() if k != 'text'}, ensure_ascii=False)
+
+def _features_from_json(data, text):
+    f = json.loads(data)
+    f['tokens'] = Counter(f['tokens'])
+    if 'phrase_tokens' not in f:  # stored before phrases were sketched
+        f.pop('ngrams', None)
+        f['phrase_tokens'] = phrase_tokens(text)
+    f['text'] = text
+    return f
+
+class SQLiteStorage(Storage):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS proposals (
+        id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        filename TEXT,
+        uploaded_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS comments (
+        id TEXT PRIMARY KEY,
+        proposal_id TEXT NOT NULL REFERENCES proposals(id),
+        name TEXT,
+        profession TEXT,
+        original TEXT NOT NULL,
+        text TEXT NOT NULL,
+        lang TEXT,
+        date TEXT NOT NULL,
+        translation_status TEXT NOT NULL DEFAULT 'pending',
+        claimed_at REAL,
+        translation_attempts INTEGER NOT NULL DEFAULT 0,
+        retry_at REAL,
+        features TEXT,
+        sentiment TEXT,
+        cluster_id TEXT,
+        minhash BLOB
+    );
+    CREATE INDEX IF NOT EXISTS comments_by_proposal_date ON comments (proposal_id, date, id);
+    CREATE INDEX IF NOT EXISTS comments_by_status ON comments (proposal_id, translation_status);
+    CREATE TABLE IF NOT EXISTS comment_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        proposal_id TEXT NOT NULL,
+        comment_id TEXT NOT NULL,
+        op TEXT NOT NULL,
+        text TEXT,
+        features TEXT
+    );
+    CREATE INDEX IF NOT EXISTS comment_log_by_proposal ON comment_log (proposal_id, seq);
+    CREATE TABLE IF NOT EXISTS clusters (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        proposal_id TEXT NOT NULL,
+        cluster_id TEXT NOT NULL,
+        minhash BLOB NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS clusters_by_proposal ON clusters (proposal_id, seq);
+    CREATE TABLE IF NOT EXISTS import_jobs (
+        id TEXT PRIMARY KEY,
+        proposal_id TEXT NOT NULL,
+        source TEXT NOT NULL,
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        rows_skipped INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL,
+        error TEXT,
+        updated_at REAL NOT NULL
+    );
+    """
+    # columns added after the first release, with the indexes that use them
+    MIGRATIONS = [
+        ('comments', 'sentiment', ["ALTER TABLE comments ADD COLUMN sentiment TEXT",
+                                   "UPDATE comments SET sentiment = json_extract(features, '$.sentiment') "
+                                   "WHERE features IS NOT NULL"]),
+        ('comments', 'cluster_id', ["ALTER TABLE comments ADD COLUMN cluster_id TEXT"]),
+        ('comments', 'minhash', ["ALTER TABLE comments ADD COLUMN minhash BLOB"]),
+        ('comment_log', 'features', ["ALTER TABLE comment_log ADD COLUMN text TEXT",
+                                     "ALTER TABLE comment_log ADD COLUMN features TEXT"]),
+        ('import_jobs', 'rows_skipped', ["ALTER TABLE import_jobs ADD COLUMN rows_skipped INTEGER NOT NULL DEFAULT 0"]),
+        ('comments', 'translation_attempts', [
+            "ALTER TABLE comments ADD COLUMN translation_attempts INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE comments ADD COLUMN retry_at REAL"]),
+    ]
+    # tables added after the first release, filled from existing rows when first created
+    BACKFILLS = {
+        'clusters': "INSERT INTO clusters (proposal_id, cluster_id, minhash) SELECT proposal_id, cluster_id, minhash "
+                    "FROM comments WHERE id = cluster_id AND length(minhash) > 0 ORDER BY rowid",
+    }
+    INDEXES = """
+    CREATE INDEX IF NOT EXISTS comments_by_sentiment ON comments (proposal_id, sentiment, date, id);
+    CREATE INDEX IF NOT EXISTS comments_by_profession ON comments (proposal_id, profession, date, id);
+    CREATE INDEX IF NOT EXISTS comments_by_cluster ON comments (proposal_id, cluster_id, date, id);
+    """
+    INSERT_COMMENT = (
+        "INSERT {or_ignore}INTO comments (id, proposal_id, name, profession, original, text, lang, date, "
+        "translation_status, features, sentiment, cluster_id, minhash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.executescript(self.SCHEMA)
+        for table, column, statements in self.MIGRATIONS:
+            if column not in {r['name'] for r in conn.execute(f"PRAGMA table_info({table})")}:
+                with conn:
+                    for sql in statements:
+                        conn.execute(sql)
+        if 'comments' in tables:
+            with conn:
+                for table, sql in self.BACKFILLS.items():
+                    if table not in tables:
+                        conn.execute(sql)
+        conn.executescript(self.INDEXES)
+
+    # one connection per thread; WAL lets readers proceed while a writer commits
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _comment(row):
+        return {k: row[k] for k in COMMENT_FIELDS}
+
+    def get_proposal(self, proposal_id):
+        row = self._conn().execute("SELECT * FROM proposals WHERE id = ?", (proposal_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_proposals(self):
+        return [dict(r) for r in self._conn().execute("SELECT * FROM proposals ORDER BY rowid")]
+
+    def add_proposal(self, proposal, or_ignore=False):
+        with self._conn() as conn:
+            cur = conn.execute(f"INSERT {'OR IGNORE ' if or_ignore else ''}INTO proposals "
+                               "(id, title, filename, uploaded_at) VALUES (?, ?, ?, ?)",
+                               (proposal['id'], proposal['title'], proposal.get('filename'), proposal['uploaded_at']))
+            return cur.rowcount == 1
+
+    def get_comment(self, proposal_id, comment_id):
+        row = self._conn().execute("SELECT * FROM comments WHERE id = ? AND proposal_id = ?",
+                                   (comment_id, proposal_id)).fetchone()
+        return self._comment(row) if row else None
+
+    def list_comments(self, proposal_id, after=None, limit=None, sentiment=None, profession=None,
+                      cluster=None, collapse=False):
+        filters = [(col, value) for col, value in (('sentiment', sentiment), ('profession', profession),
+                                                   ('cluster_id', cluster)) if value]
+        sql, params = "SELECT * FROM comments WHERE proposal_id = ?", [proposal_id]
+        for col, value in filters:
+            sql += f" AND {col} = ?"
+            params.append(value)
+        if collapse:
+            # hide a comment when an earlier member of its cluster matches the same filters
+            sql += (" AND NOT EXISTS (SELECT 1 FROM comments d WHERE d.proposal_id = comments.proposal_id "
+                    "AND d.cluster_id = comments.cluster_id AND (d.date < comments.date OR "
+                    "(d.date = comments.date AND d.id < comments.id))")
+            for col, value in filters:
+                sql += f" AND d.{col} = ?"
+                params.append(value)
+            sql += ")"
+        if after:
+            sql += " AND (date > ? OR (date = ? AND id > ?))"
+            params.extend([after[0], after[0], after[1]])
+        sql += " ORDER BY date, id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._comment(r) for r in self._conn().execute(sql, params)]
+
+    def list_professions(self, proposal_id):
+        rows = self._conn().execute("SELECT DISTINCT profession FROM comments WHERE proposal_id = ? "
+                                    "AND profession IS NOT NULL ORDER BY profession", (proposal_id,))
+        return [r[0] for r in rows]
+
+    @staticmethod
+    def _comment_row(proposal_id, c):
+        return (c['id'], proposal_id, c.get('name'), c.get('profession'), c['original'], c.get('text') or c['original'],
+                c.get('lang'), c['date'], c.get('translation_status', 'pending'),
+                _features_to_json(c['features']) if c.get('features') else None,
+                c['features']['sentiment'] if c.get('features') else None, c.get('cluster_id'), c.get('minhash'))
+
+    # comments that started a cluster
+    @staticmethod
+    def _add_cluster_heads(conn, proposal_id, comments):
+        conn.executemany("INSERT INTO clusters (proposal_id, cluster_id, minhash) VALUES (?, ?, ?)",
+                         [(proposal_id, c['id'], c['minhash']) for c in comments
+                          if c.get('minhash') and c.get('cluster_id') == c['id']])
+
+    def add_comments(self, proposal_id, comments):
+        with self._conn() as conn:
+            conn.executemany(self.INSERT_COMMENT.format(or_ignore=''),
+                             [self._comment_row(proposal_id, c) for c in comments])
+            self._add_cluster_heads(conn, proposal_id, comments)
+            conn.executemany("INSERT INTO comment_log (proposal_id, comment_id, op) VALUES (?, ?, 'ready')",
+                             [(proposal_id, c['id']) for c in comments if translation_ready(c)])
+
+    def delete_comment(self, proposal_id, comment_id):
+        with self._conn() as conn:
+            conn.execute("INSERT INTO comment_log (proposal_id, comment_id, op, text, features) "
+                         "SELECT proposal_id, id, 'delete', text, features FROM comments WHERE id = ? AND proposal_id = ?",
+                         (comment_id, proposal_id))
+            cur = conn.execute("DELETE FROM comments WHERE id = ? AND proposal_id = ?", (comment_id, proposal_id))
+            return cur.rowcount > 0
+
+    def pending_comments(self, proposal_id, limit, claim_timeout):
+        rows = self._conn().execute(
+            "SELECT * FROM comments WHERE proposal_id = ? AND ((translation_status = 'pending' AND "
+            "(retry_at IS NULL OR retry_at <= ?)) OR (translation_status = 'queued' AND claimed_at < ?)) LIMIT ?",
+            (proposal_id, time.time(), time.time() - claim_timeout, limit))
+        return [self._comment(r) for r in rows]
+
+    def count_pending(self, proposal_id):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM comments WHERE proposal_id = ? AND translation_status IN ('pending', 'queued')",
+            (proposal_id,)).fetchone()[0]
+
+    def claim_for_translation(self, comment_id, claim_timeout):
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE comments SET translation_status = 'queued', claimed_at = ? WHERE id = ? AND "
+                "((translation_status = 'pending' AND (retry_at IS NULL OR retry_at <= ?)) OR "
+                "(translation_status = 'queued' AND claimed_at < ?))",
+                (now, comment_id, now, now - claim_timeout))
+            return cur.rowcount > 0
+
+    def release_translation_claim(self, comment_id):
+        with self._conn() as conn:
+            conn.execute("UPDATE comments SET translation_status = 'pending', claimed_at = NULL "
+                         "WHERE id = ? AND translation_status = 'queued'", (comment_id,))
+
+    def defer_translation(self, comment_id, retry_at):
+        with self._conn() as conn:
+            conn.execute("UPDATE comments SET translation_status = 'pending', claimed_at = NULL, retry_at = ?, "
+                         "translation_attempts = translation_attempts + 1 WHERE id = ? AND translation_status = 'queued'",
+                         (retry_at, comment_id))
+
+    def complete_translations(self, comments):
+        with self._conn() as conn:
+            for c in comments:
+                cur = conn.execute(
+                    "UPDATE comments SET text = ?, lang = ?, translation_status = ?, features = ?, sentiment = ?, "
+                    "claimed_at = NULL WHERE id = ? AND translation_status = 'queued'",
+                    (c['text'], c.get('lang'), c['translation_status'], _features_to_json(c['features']),
+                     c['features']['sentiment'], c['id']))
+                if cur.rowcount:  # still exists and still ours
+                    conn.execute("INSERT INTO comment_log (proposal_id, comment_id, op) "
+                                 "SELECT proposal_id, id, 'ready' FROM comments WHERE id = ?", (c['id'],))
+
+    @staticmethod
+    def _logged_comment(comment_id, r):
+        comment = {'id': comment_id, 'text': r['text'], 'original': r['original'], 'date': r['date'],
+                   'profession': r['profession'], 'cluster_id': r['cluster_id']}
+        if r['features']:
+            comment['features'] = _features_from_json(r['features'], r['text'])
+        return comment
+
+    def changes_since(self, proposal_id, seq, limit=None):
+        rows = self._conn().execute(
+            "SELECT l.seq, l.op, l.comment_id, COALESCE(c.text, l.text) AS text, "
+            "COALESCE(c.features, l.features) AS features, c.date, c.profession, "
+            "COALESCE(c.original, l.text) AS original, c.cluster_id "
+            "FROM comment_log l LEFT JOIN comments c ON l.op = 'ready' AND c.id = l.comment_id "
+            "WHERE l.proposal_id = ? AND l.seq > ? ORDER BY l.seq LIMIT ?",
+            (proposal_id, seq, -1 if limit is None else limit))
+        return [(r['seq'], r['op'], r['comment_id'], self._logged_comment(r['comment_id'], r) if r['text'] is not None
+                 else None) for r in rows]
+
+    def comments_by_id(self, proposal_id, comment_ids):
+        comment_ids = list(comment_ids)
+        if not comment_ids:
+            return {}
+        rows = self._conn().execute(
+            f"SELECT id, text, features, date, profession, original, cluster_id FROM comments WHERE proposal_id = ? "
+            f"AND translation_status IN ('done', 'failed') AND id IN ({', '.join('?' * len(comment_ids))})",
+            [proposal_id, *comment_ids])
+        return {r['id']: self._logged_comment(r['id'], r) for r in rows}
 
-# Seed initial sample proposal and comments
+    def iter_comment_texts(self, proposal_id):
+        rows = self._conn().execute("SELECT id, text FROM comments WHERE proposal_id = ? "
+                                    "AND translation_status IN ('done', 'failed')", (proposal_id,))
+        for r in rows:
+            yield r[0], r[1]
+
+    def cluster_signatures(self, proposal_id, seq=0):
+        rows = self._conn().execute("SELECT seq, cluster_id, minhash FROM clusters WHERE proposal_id = ? AND seq > ? "
+                                    "ORDER BY seq", (proposal_id, seq))
+        return [(r[0], r[1], r[2]) for r in rows]
+
+    def unclustered_comments(self, proposal_id, limit):
+        rows = self._conn().execute("SELECT * FROM comments WHERE proposal_id = ? AND minhash IS NULL LIMIT ?",
+                                    (proposal_id, limit))
+        return [self._comment(r) for r in rows]
+
+    def set_clusters(self, proposal_id, comments):
+        with self._conn() as conn:
+            conn.executemany("UPDATE comments SET cluster_id = ?, minhash = ? WHERE id = ?",
+                             [(c['cluster_id'], c['minhash'], c['id']) for c in comments])
+            self._add_cluster_heads(conn, proposal_id, comments)
+
+    def cluster_translation(self, proposal_id, cluster_id):
+        row = self._conn().execute(
+            "SELECT text, lang, features FROM comments WHERE proposal_id = ? AND cluster_id = ? "
+            "AND translation_status = 'done' AND features IS NOT NULL LIMIT 1", (proposal_id, cluster_id)).fetchone()
+        return dict(row) if row else None
+
+    def cluster_sizes(self, proposal_id, cluster_ids):
+        cluster_ids = list(cluster_ids)
+        if not cluster_ids:
+            return {}
+        rows = self._conn().execute(
+            f"SELECT cluster_id, COUNT(*) FROM comments WHERE proposal_id = ? AND cluster_id IN "
+            f"({', '.join('?' * len(cluster_ids))}) GROUP BY cluster_id", [proposal_id, *cluster_ids])
+        return {r[0]: r[1] for r in rows}
+
+    def get_import_job(self, job_id):
+        row = self._conn().execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_import_jobs(self, limit=20):
+        rows = self._conn().execute("SELECT * FROM import_jobs ORDER BY updated_at DESC LIMIT ?", (limit,))
+        return [dict(r) for r in rows]
+
+    def start_import_job(self, job_id, proposal_id, source, claim_timeout):
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO import_jobs (id, proposal_id, source, status, updated_at) VALUES (?, ?, ?, 'running', ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = 'running', error = NULL, source = excluded.source, "
+                "updated_at = excluded.updated_at WHERE import_jobs.status != 'running' OR import_jobs.updated_at < ?",
+                (job_id, proposal_id, source, now, now - claim_timeout))
+            if not cur.rowcount:
+                return None
+        return self.get_import_job(job_id)
+
+    def record_import_chunk(self, job_id, proposal_id, comments, rows_done, skipped=0):
+        inserted = []
+        with self._conn() as conn:
+            for c in comments:
+                # ids are derived from the job and row number, so a resumed import never duplicates
+                cur = conn.execute(self.INSERT_COMMENT.format(or_ignore='OR IGNORE '), self._comment_row(proposal_id, c))
+                if cur.rowcount:
+                    inserted.append(c)
+                    conn.execute("INSERT INTO comment_log (proposal_id, comment_id, op) VALUES (?, ?, 'ready')",
+                                 (proposal_id, c['id']))
+            self._add_cluster_heads(conn, proposal_id, inserted)
+            conn.execute("UPDATE import_jobs SET rows_done = ?, rows_skipped = rows_skipped + ?, updated_at = ? "
+                         "WHERE id = ?", (rows_done, skipped, time.time(), job_id))
+        return len(inserted)
+
+    def finish_import_job(self, job_id, status, error=None):
+        with self._conn() as conn:
+            conn.execute("UPDATE import_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                         (status, error, time.time(), job_id))
+
+storage = SQLiteStorage(DATABASE_PATH)
+
+# Seed initial sample proposal and comments (only into an empty database)
 sample_id = "draft_policy_2025"
-proposals_db[sample_id] = {
+SAMPLE_PROPOSAL = {
     "id": sample_id,
     "title": "draft_policy_2025.pdf",
     "filename": None,
     "uploaded_at": "2025-07-01"
 }
 
-comments_db[sample_id].extend([
+SAMPLE_COMMENTS = [
     {"id": "c201", "name": "Aarav Mehta", "profession": "Lawyer", "text": "यह संशोधन नागरिक अधिकारों को मजबूत करता है और एक स्वागत योग्य बदलाव है।", "date": "2025-07-10", "original": "यह संशोधन नागरिक अधिकारों को मजबूत करता है और एक स्वागत योग्य बदलाव है।"},
     {"id": "c202", "name": "Neha Sharma", "profession": "Teacher", "text": "शिक्षकों के लिए यह प्रस्ताव अस्पष्ट आहे.", "date": "2025-07-18", "original": "शिक्षकों के लिए यह प्रस्ताव अस्पष्ट आहे."},
     {"id": "c203", "name": "Ravi Deshmukh", "profession": "Engineer", "text": "ही योजना डिजिटल पारदर्शकतेसाठी उत्कृष्ट आहे.", "date": "2025-08-05", "original": "ही योजना डिजिटल पारदर्शकतेसाठी उत्कृष्ट आहे."},
@@ -171,55 +1682,918 @@ comments_db[sample_id].extend([
     {"id":"s311","name":"Anita Desai","profession":"Retired Officer","original":"The draft recycles old frameworks and lacks measurable targets. I recommend adding SMART targets with timelines and assigning departmental accountability points. Without measurable KPIs, monitoring will remain ineffective.","text":"The draft recycles old frameworks and lacks measurable targets. I recommend adding SMART targets with timelines and assigning departmental accountability points. Without measurable KPIs, monitoring will remain ineffective.","date":"2025-11-10"},
     {"id":"s312","name":"Imran Sheikh","profession":"Journalist","original":"I find several ambiguities in the grievance redressal section. Citizens need a simple escalation matrix and maximum resolution timelines. Please include a one-page flowchart and contact points for each escalation level.","text":"I find several ambiguities in the grievance redressal section. Citizens need a simple escalation matrix and maximum resolution timelines. Please include a one-page flowchart and contact points for each escalation level.","date":"2025-11-20"}
 
-])
+]
+
+# --- Near-duplicate clustering ---
+# Copy-pasted campaign comments are grouped with MinHash signatures and LSH banding, so
+# a new comment is only compared with the clusters sharing a band bucket with it, not
+# with every stored comment. Later members of a cluster reuse a translated member's
+# translation and sentiment, count once towards phrases and the word cloud, and are
+# folded into one row on the analysis page. Signatures are stored with the comment
+# (an empty blob when the text has no usable tokens).
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16  # 4 rows per band: comments at Jaccard 0.8 share a bucket with p > 0.999
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.8))
+_MINHASH_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_minhash_rng = np.random.default_rng(20250701)  # fixed: stored signatures must stay comparable
+_MINHASH_A = _minhash_rng.integers(1, 2**32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_MINHASH_B = _minhash_rng.integers(0, 2**32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+# per-position multipliers folding each band into one 64-bit bucket key
+_BAND_MIX = np.random.default_rng(20250702).integers(1, 2**63, size=MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_cluster_word_re = re.compile(r"[\w\u0900-\u0963\u0966-\u097f]+")  # keeps Devanagari vowel signs in words
+
+# Words and word bigrams over every word: stopwords stay in, so a comment and its
+# negation ("not", "no") do not shingle alike
+def cluster_shingles(text):
+    words = _cluster_word_re.findall((text or '').lower())
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def minhash_signature(text):
+    shingles = cluster_shingles(text)
+    if not shingles:
+        return None
+    x = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_MINHASH_A[:, None] * x[None, :] + _MINHASH_B[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+# Buckets are kept in NumPy arrays rather than dicts of lists: the band keys of all
+# clusters sorted once (searched with searchsorted), plus an unsorted tail of recent
+# clusters that is scanned directly and merged in every CLUSTER_TAIL_ROWS inserts.
+# Similarity is estimated on the low 32 bits of each signature value.
+CLUSTER_TAIL_ROWS = 2048
+
+class ClusterIndex:
+    def __init__(self, proposal_id, bands=LSH_BANDS, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.proposal_id = proposal_id
+        self.bands = bands
+        self.rows = MINHASH_PERMUTATIONS // bands
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.last_seq = 0  # newest cluster loaded from storage
+        self.backfilled = False
+        self.cluster_ids = []  # row -> cluster id
+        self.known = set()
+        self.signatures = np.empty((64, MINHASH_PERMUTATIONS), dtype=np.uint32)  # row -> first comment's signature
+        self.sorted_keys = np.empty(0, dtype=np.uint64)
+        self.sorted_rows = np.empty(0, dtype=np.int32)
+        self.tail_keys = np.empty((CLUSTER_TAIL_ROWS, bands), dtype=np.uint64)
+        self.tail_start = 0  # first row not yet in sorted_keys
+
+    def _band_keys(self, sigs):
+        return (sigs * _BAND_MIX).reshape(*sigs.shape[:-1], self.bands, self.rows).sum(axis=-1, dtype=np.uint64)
+
+    def _reserve(self, n):
+        if n > len(self.signatures):
+            grown = np.empty((max(n, 2 * len(self.signatures)), MINHASH_PERMUTATIONS), dtype=np.uint32)
+            grown[:len(self.cluster_ids)] = self.signatures[:len(self.cluster_ids)]
+            self.signatures = grown
+
+    # adds the band keys of rows tail_start..tail_start + len(keys) to the sorted arrays
+    def _merge(self, keys):
+        start = self.tail_start
+        rows = np.repeat(np.arange(start, start + len(keys), dtype=np.int32), self.bands)
+        keys = np.concatenate([self.sorted_keys, keys.ravel()])
+        order = np.argsort(keys, kind='stable')  # mostly sorted runs: close to linear
+        self.sorted_keys, self.sorted_rows = keys[order], np.concatenate([self.sorted_rows, rows])[order]
+        self.tail_start = start + len(rows) // self.bands
+
+    def _merge_tail(self):
+        self._merge(self.tail_keys[:len(self.cluster_ids) - self.tail_start])
+
+    # Bulk load, e.g. every stored cluster on the first refresh
+    def insert_many(self, cluster_ids, sigs):
+        fresh = [i for i, cluster_id in enumerate(cluster_ids) if cluster_id not in self.known]
+        if len(fresh) < CLUSTER_TAIL_ROWS:
+            for i in fresh:
+                self.insert(cluster_ids[i], sigs[i])
+            return
+        self._merge_tail()
+        sigs = sigs[fresh]
+        start = len(self.cluster_ids)
+        self._reserve(start + len(fresh))
+        self.signatures[start:start + len(fresh)] = sigs
+        for i in fresh:
+            self.cluster_ids.append(cluster_ids[i])
+            self.known.add(cluster_ids[i])
+        self._merge(self._band_keys(sigs))
+
+    def insert(self, cluster_id, sig):
+        if cluster_id in self.known:
+            return
+        row = len(self.cluster_ids)
+        self._reserve(row + 1)
+        self.signatures[row] = sig
+        self.tail_keys[row - self.tail_start] = self._band_keys(sig)
+        self.cluster_ids.append(cluster_id)
+        self.known.add(cluster_id)
+        if row + 1 - self.tail_start == CLUSTER_TAIL_ROWS:
+            self._merge_tail()
+
+    # Most similar cluster at or above the threshold, or None
+    def query(self, sig):
+        keys = self._band_keys(sig)
+        lo = np.searchsorted(self.sorted_keys, keys, side='left')
+        hi = np.searchsorted(self.sorted_keys, keys, side='right')
+        parts = [self.sorted_rows[a:b] for a, b in zip(lo.tolist(), hi.tolist()) if b > a]
+        tail = len(self.cluster_ids) - self.tail_start
+        if tail:
+            parts.append(np.flatnonzero((self.tail_keys[:tail] == keys).any(axis=1)) + self.tail_start)
+        rows = np.unique(np.concatenate(parts)) if parts else ()
+        if not len(rows):
+            return None
+        sims = (self.signatures[rows] == sig.astype(np.uint32)).mean(axis=1)
+        best = int(sims.argmax())
+        return self.cluster_ids[rows[best]] if sims[best] >= self.threshold else None
+
+    def assign(self, comments):
+        for c in comments:
+            sig = minhash_signature(c['original'])
+            if sig is None:
+                c['cluster_id'], c['minhash'] = None, b''
+                continue
+            cluster_id = self.query(sig)
+            if cluster_id is None:
+                cluster_id = c['id']
+                self.insert(cluster_id, sig)
+            c['cluster_id'], c['minhash'] = cluster_id, sig.tobytes()
+
+    # Load clusters created since the last refresh (by any process); the first refresh
+    # also clusters comments stored before clustering existed
+    def refresh(self):
+        loaded = storage.cluster_signatures(self.proposal_id, self.last_seq)
+        if loaded:
+            sigs = np.frombuffer(b''.join(blob for _, _, blob in loaded), dtype=np.uint64)
+            self.insert_many([cluster_id for _, cluster_id, _ in loaded], sigs.reshape(-1, MINHASH_PERMUTATIONS))
+            self.last_seq = loaded[-1][0]
+        while not self.backfilled:
+            legacy = storage.unclustered_comments(self.proposal_id, 500)
+            if not legacy:
+                self.backfilled = True
+                break
+            self.assign(legacy)
+            storage.set_clusters(self.proposal_id, legacy)
+
+cluster_indexes = {}
+_cluster_indexes_lock = threading.Lock()
+
+# Sets cluster_id/minhash on each comment; comments whose cluster already has a
+# translated member take its translation, sentiment and features and are marked done.
+# Members in a language without a translation model are not reused: there is nothing
+# to save, and the comment's own text is scored on the usual path.
+def cluster_comments(proposal_id, comments):
+    with _cluster_indexes_lock:
+        index = cluster_indexes.get(proposal_id)
+        if index is None:
+            index = cluster_indexes[proposal_id] = ClusterIndex(proposal_id)
+    with index.lock:
+        index.refresh()
+        index.assign(comments)
+    translated = {}
+    for c in comments:
+        cluster_id = c['cluster_id']
+        if cluster_id is None or cluster_id == c['id'] or translation_ready(c):
+            continue
+        if cluster_id not in translated:
+            translated[cluster_id] = storage.cluster_translation(proposal_id, cluster_id)
+        member = translated[cluster_id]
+        if member is None or translation_model_for(member['lang']) is None:
+            continue
+        text = member['text']
+        features = _features_from_json(member['features'], text)
+        features['month'] = month_key_for(c.get('date', ''))
+        features['profession'] = c.get('profession')
+        c.update(text=text, lang=member['lang'], translation_status='done', features=features)
+    return comments
+
+# --- Incremental per-proposal analytics ---
+# Every comment is scored and tokenized once, when its English text is final, and folded
+# into its proposal's running aggregates. delete_comment subtracts the same contribution,
+# so the dashboard only reads precomputed state.
+SUMMARY_TOKEN_LIMIT = 50
+# Controversial phrases: require minimum frequency before cross-sentiment check.
+# 'token' matches phrases on n-gram (token) boundaries through the sentiment sketches;
+# 'substring' keeps the older `phrase in text` test, still using cached sentiment.
+MIN_PHRASE_FREQ = 2
+QUOTE_CANDIDATES = 10
+PHRASE_MATCH_MODE = os.environ.get('PHRASE_MATCH_MODE', 'token')
+
+def month_key_for(date_str):
+    # ensure month key is consistently formatted as YYYY-MM for correct chronological sorting
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m")
+    except Exception:
+        # fallback: if date is partial or malformed, try to parse year-month if present
+        try:
+            return datetime.strptime(date_str, "%Y-%m").strftime("%Y-%m")
+        except Exception:
+            return date_str
+
+def _parse_month_key(k):
+    try:
+        return datetime.strptime(k, "%Y-%m")
+    except Exception:
+        # try common alternatives, fallback to epoch ordering
+        try:
+            return datetime.strptime(k, "%Y-%m-%d")
+        except Exception:
+            return None
+
+# Sentiment for the whole batch is scored in one backend call
+def comment_features_batch(comments):
+    texts = [c.get('text') or '' for c in comments]
+    polarities = sentiment_polarities(texts)
+    with stage_timer('tokenize'):
+        token_lists = [tokenize_filtered(text) for text in texts]
+    with stage_timer('phrase_tokens'):
+        # Use translated English text for phrase extraction if available, else original
+        phrase_token_lists = [phrase_tokens(c.get('text') or c.get('original') or '') for c in comments]
+    features = []
+    for comment, text, polarity, label, tokens, phrase_toks in zip(
+            comments, texts, polarities, label_polarities(polarities), token_lists, phrase_token_lists):
+        features.append({
+            'sentiment': label,
+            'polarity': float(polarity),
+            'tokens': Counter(tokens),
+            'summary_tokens': tokens[:SUMMARY_TOKEN_LIMIT],
+            'phrase_tokens': phrase_toks,
+            'month': month_key_for(comment.get('date', '')),
+            'profession': comment.get('profession'),
+            'text': text,
+        })
+    return features
+
+# comments stored without features (e.g. by an older release) are scored here
+def _score_unscored(comments):
+    unscored = [c for c in comments if 'features' not in c]
+    if unscored:
+        for c, f in zip(unscored, comment_features_batch(unscored)):
+            c['features'] = f
+
+# drop entries that reach zero so the aggregates stay proportional to live comments
+def _bump(counter, key, n):
+    counter[key] += n
+    if counter[key] <= 0:
+        del counter[key]
+
+ANALYTICS_SYNC_PAGE_SIZE = int(os.environ.get('ANALYTICS_SYNC_PAGE_SIZE', 1000))
+
+class ProposalAnalytics:
+    def __init__(self, proposal_id):
+        self.proposal_id = proposal_id
+        self.last_seq = 0  # last comment_log entry folded in
+        self._sync_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # Only what the per-submission counts need stays in memory; text features are
+        # read back from storage (or from the delete log entry) when they are subtracted
+        self.submissions = {}  # comment id -> (sentiment, month, profession), in ingest order
+        self.sentiment_counts = Counter()
+        self.timeline = defaultdict(Counter)
+        self.professions = defaultdict(Counter)
+        self.sentiment_tokens = Counter()  # tokens of positive/negative comments only
+        # the first replay counts at the largest sketch width, then folds to fit
+        self.phrase_summary = PhraseSummary()
+        self.phrase_summary_fitted = False
+        # Near-duplicates count once towards tokens and phrases: only the earliest live
+        # member of a cluster contributes its text
+        self.cluster_of = {}  # comment id -> cluster id (its own id when unclustered)
+        self.cluster_members = defaultdict(list)  # cluster id -> live member ids, oldest first
+        self.text_missing = set()  # first members whose row was gone before their text was applied
+        self.near_duplicates = 0  # live comments that are not the first of their cluster
+        self._summary = None  # cached summary text, reset on every change
+
+    # per-submission aggregates
+    def _apply(self, entry, sign):
+        s, month, profession = entry
+        _bump(self.sentiment_counts, s, sign)
+        _bump(self.timeline[month], s, sign)
+        _bump(self.professions[profession], s, sign)
+        for nested, key in ((self.timeline, month), (self.professions, profession)):
+            if not nested[key]:
+                del nested[key]
+
+    # text aggregates, applied once per cluster
+    def _apply_text(self, f, sign):
+        if f['sentiment'] in ('positive', 'negative'):
+            for tok, n in f['tokens'].items():
+                _bump(self.sentiment_tokens, tok, sign * n)
+        self.phrase_summary.update(f['phrase_tokens'], f['sentiment'], sign)
+
+    # Stored comments with features, scoring any stored without them (e.g. by an older release)
+    def _load(self, comment_ids):
+        comments = storage.comments_by_id(self.proposal_id, comment_ids)
+        _score_unscored(comments.values())
+        return comments
+
+    def _add(self, comment_id, f, cluster_id=None):
+        if comment_id in self.submissions:
+            return  # a comment becomes ready once; this entry is a replay
+        self._summary = None
+        entry = self.submissions[comment_id] = tuple(sys.intern(v) if isinstance(v, str) else v
+                                                      for v in (f['sentiment'], f['month'], f['profession']))
+        self._apply(entry, 1)
+        cluster_id = self.cluster_of[comment_id] = cluster_id or comment_id
+        members = self.cluster_members[cluster_id]
+        members.append(comment_id)
+        if len(members) == 1:
+            self._apply_text(f, 1)
+        else:
+            self.near_duplicates += 1
+
+    # f: the text features the comment had, from its delete log entry
+    def _remove(self, comment_id, f):
+        entry = self.submissions.pop(comment_id, None)
+        if entry is None:
+            return
+        self._summary = None
+        self._apply(entry, -1)
+        cluster_id = self.cluster_of.pop(comment_id)
+        members = self.cluster_members[cluster_id]
+        was_first = members[0] == comment_id
+        members.remove(comment_id)
+        if members:
+            self.near_duplicates -= 1
+        else:
+            del self.cluster_members[cluster_id]
+        if was_first:
+            if comment_id in self.text_missing:
+                self.text_missing.discard(comment_id)
+            elif f is not None:
+                self._apply_text(f, -1)
+            if members:  # the next member now speaks for the cluster
+                successor = self._load([members[0]]).get(members[0])
+                if successor is None:  # deleted too; its own delete entry follows
+                    self.text_missing.add(members[0])
+                else:
+                    self._apply_text(successor['features'], 1)
+
+    # Fold in comment_log entries written (by any process) since the last sync
+    # in pages of ANALYTICS_SYNC_PAGE_SIZE entries, so a cold replay holds one page at a time
+    def sync(self):
+        with self._sync_lock, stage_timer('analytics_sync'):
+            changed = False
+            while True:
+                changes = storage.changes_since(self.proposal_id, self.last_seq, ANALYTICS_SYNC_PAGE_SIZE)
+                if not changes:
+                    break
+                changed = True
+                _score_unscored(c for _, _, _, c in changes if c is not None)
+                with self._lock:
+                    for seq, op, comment_id, comment in changes:
+                        if op == 'delete':
+                            self._remove(comment_id, comment['features'] if comment else None)
+                        elif comment is not None:
+                            self._add(comment_id, comment['features'], comment.get('cluster_id'))
+                    self.last_seq = changes[-1][0]
+                if len(changes) < ANALYTICS_SYNC_PAGE_SIZE:
+                    break
+            if not changed and self.phrase_summary_fitted:
+                return
+            with self._lock:
+                if not self.phrase_summary_fitted:
+                    self.phrase_summary.fit()
+                    self.phrase_summary_fitted = True
+                elif self.phrase_summary.outgrown():
+                    self._rebuild_phrases()
+
+    # Counts the phrases of the live cluster heads again, in sketches sized for twice the
+    # current count; the doubling keeps the re-reads linear overall
+    def _rebuild_phrases(self):
+        summary = PhraseSummary(2 * self.phrase_summary.counts.total)
+        heads = [members[0] for members in self.cluster_members.values() if members[0] not in self.text_missing]
+        for start in range(0, len(heads), 500):
+            for comment in self._load(heads[start:start + 500]).values():
+                summary.update(comment['features']['phrase_tokens'], comment['features']['sentiment'])
+        self.phrase_summary = summary
+
+    def sentiment_of(self, comment_id):
+        entry = self.submissions.get(comment_id)
+        return entry[0] if entry else None
+
+    def controversial_phrases(self, min_freq=MIN_PHRASE_FREQ, mode=PHRASE_MATCH_MODE):
+        # phrases used in at least one positive and one negative comment
+        with self._lock, stage_timer('controversial_phrases'):
+            if mode != 'substring':
+                return self.phrase_summary.controversial(min_freq)
+            phrases = [p for p, _ in self.phrase_summary.top(len(self.phrase_summary.tracked), min_freq)]
+            labels = {p: set() for p in phrases}
+            for comment_id, text in storage.iter_comment_texts(self.proposal_id):
+                sentiment = self.sentiment_of(comment_id)
+                if sentiment is not None:
+                    for p in phrases:
+                        if p in text:
+                            labels[p].add(sentiment)
+            return [p for p in phrases if 'positive' in labels[p] and 'negative' in labels[p]]
+
+    # Summary tokens of the earliest positive/negative cluster heads, read from storage
+    # in small batches until there are enough
+    def _summary_text(self):
+        tokens = []
+        heads = (comment_id for comment_id, entry in self.submissions.items()
+                 if entry[0] in ('positive', 'negative') and comment_id not in self.text_missing
+                 and self.cluster_members[self.cluster_of[comment_id]][0] == comment_id)
+        while len(tokens) < SUMMARY_TOKEN_LIMIT:
+            batch = [comment_id for comment_id, _ in zip(heads, range(SUMMARY_TOKEN_LIMIT))]
+            if not batch:
+                break
+            loaded = self._load(batch)
+            for comment_id in batch:
+                if comment_id in loaded:
+                    tokens.extend(loaded[comment_id]['features']['summary_tokens'])
+        return ' '.join(tokens[:SUMMARY_TOKEN_LIMIT])
+
+    def snapshot(self):
+        with self._lock:
+            if self._summary is None:
+                self._summary = self._summary_text()
+            # sort months chronologically by parsing YYYY-MM keys, then format labels
+            month_items = [(k, dict(v), _parse_month_key(k)) for k, v in self.timeline.items()]
+            month_items.sort(key=lambda x: (x[2] is None, x[2] or x[0]))
+            timeline_ordered = {}
+            for k, v, dt in month_items:
+                label = dt.strftime("%b %Y") if dt else k
+                timeline_ordered[label] = {s: v.get(s, 0) for s in ('positive', 'neutral', 'negative')}
+            return {
+                'pos': self.sentiment_counts['positive'],
+                'neu': self.sentiment_counts['neutral'],
+                'neg': self.sentiment_counts['negative'],
+                'top_words': self.sentiment_tokens.most_common(5),
+                'summary': self._summary,
+                'sentiment_tokens': Counter(self.sentiment_tokens),
+                'timeline': timeline_ordered,
+                'professions': {p: {s: v.get(s, 0) for s in ('positive', 'neutral', 'negative')}
+                                for p, v in self.professions.items()},
+                'phrases': self.phrase_summary.top(QUOTE_CANDIDATES),
+                'phrase_error_bound': self.phrase_summary.error_bound(),
+                'near_duplicates': self.near_duplicates,
+            }
+
+# The most recently used proposals keep their analytics; an evicted one is rebuilt from
+# the comment log when it is next viewed
+ANALYTICS_CACHE_PROPOSALS = int(os.environ.get('ANALYTICS_CACHE_PROPOSALS', 64))
+analytics_db = OrderedDict()
+_analytics_lock = threading.Lock()
+
+def analytics_for(proposal_id):
+    with _analytics_lock:
+        stats = analytics_db.get(proposal_id)
+        if stats is None:
+            cluster_comments(proposal_id, [])  # cluster comments stored before clustering existed
+            stats = analytics_db[proposal_id] = ProposalAnalytics(proposal_id)
+            while len(analytics_db) > ANALYTICS_CACHE_PROPOSALS:
+                analytics_db.popitem(last=False)
+        analytics_db.move_to_end(proposal_id)
+    stats.sync()
+    return stats
+
+def seed_storage():
+    if storage.list_proposals():
+        return
+    # workers booting together all get here; only the one that adds the proposal seeds it
+    if not storage.add_proposal(SAMPLE_PROPOSAL, or_ignore=True):
+        return
+    comments = cluster_comments(sample_id, [dict(c, translation_status='done') for c in SAMPLE_COMMENTS])
+    for comment, features in zip(comments, comment_features_batch(comments)):
+        comment['features'] = features
+    storage.add_comments(sample_id, comments)
+
+seed_storage()
+
+# --- Wordcloud rendering cache ---
+# Images are named after a hash of the token frequency distribution, so a proposal's
+# wordcloud is rendered once per distinct distribution and reused until it changes.
+# Superseded images are removed, and the directory is capped by age, file count and size.
+WORDCLOUD_WIDTH, WORDCLOUD_HEIGHT = 1000, 500
+WORDCLOUD_MAX_FILES = int(os.environ.get('WORDCLOUD_MAX_FILES', 500))
+WORDCLOUD_MAX_BYTES = int(os.environ.get('WORDCLOUD_MAX_BYTES', 200 * 1024 * 1024))
+WORDCLOUD_MAX_AGE_DAYS = float(os.environ.get('WORDCLOUD_MAX_AGE_DAYS', 30))
+WORDCLOUD_ASYNC = os.environ.get('WORDCLOUD_ASYNC', '0') == '1'  # render off the request thread
+
+_wordcloud_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wordcloud')
+_wordcloud_rendering = set()
+_wordcloud_lock = threading.Lock()
+
+def wordcloud_key(frequencies):
+    payload = json.dumps([WORDCLOUD_WIDTH, WORDCLOUD_HEIGHT, sorted(frequencies.items())], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def _wordcloud_name_re(safe_pid):
+    return re.compile(re.escape(safe_pid) + r'_[0-9a-f]{16}\.png$')
+
+def render_wordcloud(proposal_id, frequencies, fname):
+    full_path = os.path.join(WORDCLOUD_DIR, fname)
+    try:
+        with stage_timer('wordcloud'):
+            wc = WordCloud(width=WORDCLOUD_WIDTH, height=WORDCLOUD_HEIGHT, background_color='white',
+                           collocations=False).generate_from_frequencies(frequencies)
+            tmp_path = full_path + '.tmp'
+            wc.to_image().save(tmp_path, format='PNG')
+        os.replace(tmp_path, full_path)
+        # the previous image for this proposal is superseded
+        name_re = _wordcloud_name_re(safe_filename(proposal_id))
+        for other in os.listdir(WORDCLOUD_DIR):
+            if other != fname and name_re.match(other):
+                os.remove(os.path.join(WORDCLOUD_DIR, other))
+        gc_wordclouds(keep={fname})
+    except Exception as e:
+        print("WordCloud error:", e)
+    finally:
+        with _wordcloud_lock:
+            _wordcloud_rendering.discard(fname)
+
+def gc_wordclouds(keep=()):
+    entries = []
+    for name in os.listdir(WORDCLOUD_DIR):
+        if not name.endswith('.png') or name in keep:
+            continue
+        path = os.path.join(WORDCLOUD_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()  # oldest first
+    cutoff = time.time() - WORDCLOUD_MAX_AGE_DAYS * 86400
+    total = sum(e[1] for e in entries)
+    count = len(entries) + len(keep)
+    for mtime, size, path in entries:
+        if mtime >= cutoff and count <= WORDCLOUD_MAX_FILES and total <= WORDCLOUD_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        count -= 1
+        total -= size
+
+# Returns (static filename or None, rendering_in_progress)
+def wordcloud_for(proposal_id, frequencies):
+    if not frequencies:
+        return None, False
+    fname = f"{safe_filename(proposal_id)}_{wordcloud_key(frequencies)}.png"
+    full_path = os.path.join(WORDCLOUD_DIR, fname)
+    if os.path.exists(full_path):
+        os.utime(full_path)  # keep recently viewed images out of the age-based cleanup
+        return f"wordclouds/{fname}", False
+    with _wordcloud_lock:
+        already_rendering = fname in _wordcloud_rendering
+        _wordcloud_rendering.add(fname)
+    if WORDCLOUD_ASYNC:
+        if not already_rendering:
+            _wordcloud_executor.submit(render_wordcloud, proposal_id, dict(frequencies), fname)
+        return None, True
+    if not already_rendering:
+        render_wordcloud(proposal_id, frequencies, fname)
+    return (f"wordclouds/{fname}", False) if os.path.exists(full_path) else (None, already_rendering)
+
+# --- Comment pagination and streamed pages ---
+# Comment lists are paged by an opaque (date, id) cursor, so the proposal and analysis
+# pages render one page and fetch the rest from the JSON endpoint. Pages are streamed,
+# so the first bytes go out before the whole template has been rendered.
+COMMENTS_PAGE_SIZE = int(os.environ.get('COMMENTS_PAGE_SIZE', 50))
+COMMENTS_MAX_PAGE_SIZE = 200
+
+def encode_cursor(comment):
+    raw = json.dumps([comment['date'], comment['id']], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        date, comment_id = json.loads(raw)
+        return str(date), str(comment_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+# Filter values are strings (or None) so pages can pass them back as query parameters
+# Sentiment labels and clusters are analysis output: only admins may filter on them
+def comment_filters(args, collapse=False, admin=False):
+    sentiment = args.get('sentiment') or None
+    if not admin or sentiment not in SENTIMENT_LABELS:
+        sentiment = None
+    cluster = (args.get('cluster') or None) if admin else None
+    collapse = admin and args.get('collapse', '1' if collapse else '0') == '1' and not cluster
+    return {'sentiment': sentiment, 'profession': args.get('profession') or None,
+            'cluster': cluster, 'collapse': '1' if collapse else None}
+
+# Returns (comments, next_cursor); raises ValueError for a malformed cursor.
+# Each comment carries cluster_size, the number of near-identical submissions it stands for.
+def comment_page(proposal_id, args, cursor=None, collapse=False, admin=False):
+    try:
+        limit = min(max(int(args.get('limit', COMMENTS_PAGE_SIZE)), 1), COMMENTS_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = COMMENTS_PAGE_SIZE
+    after = decode_cursor(cursor) if cursor else None
+    rows = storage.list_comments(proposal_id, after=after, limit=limit + 1, **comment_filters(args, collapse, admin))
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    sizes = storage.cluster_sizes(proposal_id, {c['cluster_id'] for c in rows if c['cluster_id']})
+    for c in rows:
+        c['cluster_size'] = sizes.get(c['cluster_id'], 1)
+    return rows, next_cursor
+
+def stream_page(template_name, **context):
+    if g.get('profiler'):  # render inside the profiled request, not while streaming
+        return render_template(template_name, **context)
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(16)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+# --- Bulk comment import ---
+# CSV/JSONL files are streamed in chunks through bounded stages running in parallel:
+# read -> language detection -> batched translation -> sentiment/tokenization -> bulk
+# write. Each chunk is committed together with the job's row counter, and the job id
+# is the file's content hash, so re-running an interrupted import resumes after the
+# last committed row. Rows that don't parse (or have no comment text) are skipped and
+# counted; when a stage fails, the chunks before the failing one are still committed.
+# A job is run by one process at a time: another run takes it over only after it has
+# made no progress for IMPORT_CLAIM_TIMEOUT seconds.
+IMPORT_DIR = os.path.join(DATA_DIR, 'imports')
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 256))
+IMPORT_QUEUE_CHUNKS = 4  # chunks buffered between two stages
+IMPORT_CLAIM_TIMEOUT = float(os.environ.get('IMPORT_CLAIM_TIMEOUT', 600))
+os.makedirs(IMPORT_DIR, exist_ok=True)
+
+_IMPORT_DONE = object()
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Yields one record per row, or None for a row that does not parse
+def iter_import_records(path, fmt=None):
+    fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+    with open(path, encoding='utf-8-sig', newline='', errors='replace') as f:
+        if fmt == 'jsonl':
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield None
+        else:
+            reader = csv.DictReader(f)
+            while True:
+                try:
+                    yield next(reader)
+                except StopIteration:
+                    return
+                except csv.Error:
+                    yield None
+
+# Returns None for rows to skip: not an object, or no comment text
+def import_record_to_comment(job_id, row_number, record):
+    if not isinstance(record, dict):
+        return None
+    text = str(record.get('comment') or record.get('original') or record.get('text') or '').strip()
+    if not text:
+        return None
+    return {
+        # namespaced by job: a source id may collide with comments of any proposal
+        'id': f"imp-{job_id[:12]}-{row_number}",
+        'name': str(record.get('name') or '').strip() or 'Anonymous',
+        'profession': str(record.get('profession') or '').strip() or 'Citizen',
+        'original': text,
+        'date': str(record.get('date') or '').strip() or datetime.today().strftime("%Y-%m-%d"),
+        'translation_status': 'pending',
+    }
+
+# Queue items are (last row number, skipped rows, comments)
+def _import_read_stage(job, path, fmt, out, errors):
+    chunk, skipped, rows_done = [], 0, job['rows_done']
+    row_number = rows_done
+    for row_number, record in enumerate(iter_import_records(path, fmt), start=1):
+        if row_number <= rows_done:
+            continue  # committed by an earlier run
+        if errors:
+            return  # a later stage failed; nothing after its chunk is committed
+        comment = import_record_to_comment(job['id'], row_number, record)
+        if comment:
+            chunk.append(comment)
+        else:
+            skipped += 1
+        if row_number % IMPORT_CHUNK_SIZE == 0:
+            out.put((row_number, skipped, chunk))
+            chunk, skipped = [], 0
+            rows_done = row_number
+    if row_number > rows_done:
+        out.put((row_number, skipped, chunk))
+
+# comments that took a cluster member's translation skip the later stages
+def _import_detect_stage(chunk):
+    todo = [c for c in chunk if not translation_ready(c)]
+    for c, detected in zip(todo, detect_texts([c['original'] for c in todo])):
+        c['detected'] = detected
+    return chunk
+
+def _import_translate_stage(chunk):
+    todo = [c for c in chunk if 'detected' in c]
+    translated = translate_detected([c['original'] for c in todo], [c.pop('detected') for c in todo])
+    for c, (lang_code, english) in zip(todo, translated):
+        c['lang'], c['text'], c['translation_status'] = lang_code, english, 'done'
+    return chunk
+
+def _import_features_stage(chunk):
+    todo = [c for c in chunk if 'features' not in c]
+    for c, features in zip(todo, comment_features_batch(todo)):
+        c['features'] = features
+    return chunk
+
+# Chunks arrive in row order, so after a failure this stage only drops later chunks;
+# the ones it already passed on still get committed downstream.
+def _run_import_stage(fn, inbox, outbox, errors):
+    failed = False
+    while True:
+        item = inbox.get()
+        if item is _IMPORT_DONE:
+            outbox.put(_IMPORT_DONE)
+            return
+        if failed:
+            continue  # drain so upstream stages are not blocked
+        try:
+            row_number, skipped, chunk = item
+            outbox.put((row_number, skipped, fn(chunk) if chunk else chunk))
+        except Exception as e:
+            errors.append(e)
+            failed = True
+
+# progress(rows_done, comments_written) is called after every committed chunk
+def import_comments(proposal_id, path, fmt=None, progress=None):
+    if not storage.get_proposal(proposal_id):
+        raise ValueError(f"unknown proposal {proposal_id!r}")
+    job_id = hashlib.sha256(f"{proposal_id}\0{file_sha256(path)}".encode('utf-8')).hexdigest()
+    job = storage.get_import_job(job_id)
+    if job and job['status'] == 'done':
+        return job
+    job = storage.start_import_job(job_id, proposal_id, os.path.basename(path), IMPORT_CLAIM_TIMEOUT)
+    if job is None:
+        raise RuntimeError(f"import {job_id[:12]} is already running")
+    stage_fns = [lambda chunk: cluster_comments(proposal_id, chunk),
+                 _import_detect_stage, _import_translate_stage, _import_features_stage]
+    queues = [queue.Queue(maxsize=IMPORT_QUEUE_CHUNKS) for _ in range(len(stage_fns) + 1)]
+    errors = []
+
+    def read():
+        try:
+            _import_read_stage(job, path, fmt, queues[0], errors)
+        except Exception as e:
+            errors.append(e)
+        queues[0].put(_IMPORT_DONE)
+
+    stages = [threading.Thread(target=read, name='import-read', daemon=True)]
+    for i, fn in enumerate(stage_fns):
+        stages.append(threading.Thread(target=_run_import_stage, args=(fn, queues[i], queues[i + 1], errors),
+                                       name=f'import-stage-{i}', daemon=True))
+    for t in stages:
+        t.start()
+    written, failed = 0, False
+    while True:
+        item = queues[-1].get()
+        if item is _IMPORT_DONE:
+            break
+        if failed:
+            continue
+        row_number, skipped, chunk = item
+        try:
+            written += storage.record_import_chunk(job_id, proposal_id, chunk, row_number, skipped)
+        except Exception as e:
+            errors.append(e)
+            failed = True
+            continue
+        if progress:
+            progress(row_number, written)
+    for t in stages:
+        t.join()
+    if errors:
+        storage.finish_import_job(job_id, 'failed', repr(errors[0]))
+        raise errors[0]
+    storage.finish_import_job(job_id, 'done')
+    return storage.get_import_job(job_id)
+
+def _import_in_background(proposal_id, path):
+    try:
+        import_comments(proposal_id, path)
+    except Exception as e:
+        print("Import error:", e)
+
+@app.cli.command('import-comments')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--proposal', 'proposal_id', required=True, help='Proposal the comments belong to.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Input format (default: from the file extension).')
+def import_comments_command(path, proposal_id, fmt):
+    """Bulk-import comments from a CSV or JSONL file; re-run to resume."""
+    start = time.perf_counter()
+
+    def report(rows_done, written):
+        rate = written / max(time.perf_counter() - start, 1e-9)
+        click.echo(f"\r{rows_done} rows read, {written} comments written ({rate:.0f}/s)", nl=False, err=True)
+
+    job = import_comments(proposal_id, path, fmt, progress=report)
+    click.echo(f"\nImport {job['id'][:12]} {job['status']}: {job['rows_done']} rows, "
+               f"{job['rows_skipped']} skipped", err=True)
+
+# --- Proposal files ---
+# Uploads are copied to disk in chunks while being hashed and stored under their SHA-256,
+# so uploading the same file twice keeps one copy and the name doubles as a strong ETag.
+# Files saved before content addressing are hashed once per (mtime, size).
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+_content_name_re = re.compile(r'^([0-9a-f]{64})\.\w+$')
+_file_etags = {}
+
+class UploadTooLarge(Exception):
+    pass
+
+def store_upload(file, directory, suffix, limit, magic=None):
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                if size == 0 and magic and not chunk.startswith(magic):
+                    raise ValueError("unexpected file type")
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLarge(f"upload exceeds {limit} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise ValueError("empty upload")
+        name = digest.hexdigest() + suffix
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(tmp_path)  # same content already stored
+        else:
+            os.replace(tmp_path, path)
+        return name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def file_etag(filename, path):
+    match = _content_name_re.match(filename)
+    if match:
+        return match.group(1)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    etag = _file_etags.get(key)
+    if etag is None:
+        etag = _file_etags[key] = file_sha256(path)
+    return etag
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    if request.endpoint == 'upload_proposal':
+        return render_template('upload_proposal.html',
+                               error=f"PDF is larger than {PROPOSAL_MAX_BYTES // (1024 * 1024)} MB"), 413
+    return "Upload too large", 413
 
 # --- Routes ---
 @app.route('/')
 def home():
-    proposals = list(proposals_db.values())
+    proposals = storage.list_proposals()
     return render_template('home.html', proposals=proposals, is_admin=session.get('admin', False))
 
 @app.route('/proposal/<proposal_id>', methods=['GET'])
 def proposal_page(proposal_id):
-    prop = proposals_db.get(proposal_id)
+    prop = storage.get_proposal(proposal_id)
     if not prop:
         return "Proposal not found", 404
-    comments = comments_db.get(proposal_id, [])
-    for c in comments:
-        if 'original' not in c:
-            try:
-                detected = detect(c.get('text', ''))
-            except Exception:
-                detected = 'en'
-            c['original'] = c.get('text', '')
-            c['text'] = translate_to_english(c['original'], detected)
-    return render_template('proposal.html', proposal=prop, comments=comments, is_admin=session.get('admin', False))
+    enqueue_pending_translations(proposal_id)
+    is_admin = session.get('admin', False)
+    comments, next_cursor = comment_page(proposal_id, request.args, admin=is_admin)
+    return stream_page('proposal.html', proposal=prop, comments=comments, next_cursor=next_cursor,
+                       filters=comment_filters(request.args, admin=is_admin),
+                       professions=storage.list_professions(proposal_id), is_admin=is_admin)
 
 @app.route('/submit_comment', methods=['POST'])
 def submit_comment():
     data = request.form
     proposal_id = data.get('proposal')
-    if not proposal_id or proposal_id not in proposals_db:
+    if not proposal_id or not storage.get_proposal(proposal_id):
         return redirect(url_for('home'))
     raw_text = data.get('comment', '').strip()
     name = data.get('name', '').strip() or 'Anonymous'
     profession = data.get('profession', '').strip() or 'Citizen'
     if not raw_text:
         return redirect(url_for('proposal_page', proposal_id=proposal_id))
-    try:
-        lang_code = detect(raw_text)
-    except Exception:
-        lang_code = 'en'
-    translated = translate_to_english(raw_text, lang_code)
     comment = {
         'id': str(uuid.uuid4()),
         'name': name,
         'profession': profession,
-        'text': translated,
+        'text': raw_text,
         'original': raw_text,
-        'date': datetime.today().strftime("%Y-%m-%d")
+        'date': datetime.today().strftime("%Y-%m-%d"),
+        'translation_status': 'pending'
     }
-    comments_db.setdefault(proposal_id, []).append(comment)
+    cluster_comments(proposal_id, [comment])
+    storage.add_comment(proposal_id, comment)
+    if not translation_ready(comment):
+        enqueue_translation(proposal_id, comment)
     return redirect(url_for('proposal_page', proposal_id=proposal_id))
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -243,26 +2617,28 @@ def upload_proposal():
     if not session.get('admin'):
         return redirect(url_for('login'))
     if request.method == 'POST':
+        request.max_content_length = PROPOSAL_MAX_BYTES + UPLOAD_FORM_OVERHEAD  # before the body is read
         title = request.form.get('title', '').strip()
         file = request.files.get('file')
         if not title or not file:
             return render_template('upload_proposal.html', error="Title and PDF required")
         if not file.filename.lower().endswith('.pdf'):
             return render_template('upload_proposal.html', error="Only PDF files are allowed")
+        try:
+            fname = store_upload(file, PROPOSAL_DIR, '.pdf', PROPOSAL_MAX_BYTES, magic=b'%PDF-')
+        except UploadTooLarge:
+            abort(413)
+        except ValueError:
+            return render_template('upload_proposal.html', error="Only PDF files are allowed")
         pid = safe_filename(title)
-        if pid in proposals_db:
+        if storage.get_proposal(pid):
             pid = f"{pid}_{str(uuid.uuid4())[:8]}"
-        fname = f"{pid}_{int(datetime.now().timestamp())}.pdf"
-        safe_fname = safe_filename(fname)
-        save_path = os.path.join(PROPOSAL_DIR, safe_fname)
-        file.save(save_path)
-        proposals_db[pid] = {
+        storage.add_proposal({
             "id": pid,
             "title": title,
-            "filename": safe_fname,
+            "filename": fname,
             "uploaded_at": datetime.today().strftime("%Y-%m-%d")
-        }
-        comments_db.setdefault(pid, [])
+        })
         return redirect(url_for('admin_dashboard'))
     return render_template('upload_proposal.html')
 
@@ -270,153 +2646,122 @@ def upload_proposal():
 def admin_dashboard():
     if not session.get('admin'):
         return redirect(url_for('login'))
-    proposals = list(proposals_db.values())
-    return render_template('admin_dashboard.html', proposals=proposals)
+    proposals = storage.list_proposals()
+    return render_template('admin_dashboard.html', proposals=proposals, import_jobs=storage.list_import_jobs())
+
+@app.route('/admin/import', methods=['POST'])
+def import_comments_upload():
+    if not session.get('admin'):
+        return redirect(url_for('login'))
+    request.max_content_length = IMPORT_MAX_BYTES + UPLOAD_FORM_OVERHEAD  # before the body is read
+    proposal_id = request.form.get('proposal', '')
+    file = request.files.get('file')
+    if not storage.get_proposal(proposal_id) or not file or not file.filename:
+        return redirect(url_for('admin_dashboard'))
+    ext = os.path.splitext(file.filename)[1].lower()
+    if ext not in ('.csv', '.jsonl', '.ndjson'):
+        return redirect(url_for('admin_dashboard'))
+    try:
+        path = os.path.join(IMPORT_DIR, store_upload(file, IMPORT_DIR, ext, IMPORT_MAX_BYTES))
+    except UploadTooLarge:
+        abort(413)
+    except ValueError:
+        return redirect(url_for('admin_dashboard'))
+    threading.Thread(target=_import_in_background, args=(proposal_id, path), daemon=True).start()
+    return redirect(url_for('admin_dashboard'))
 
 @app.route('/static/proposals/<path:filename>')
 def serve_proposal_file(filename):
-    return send_from_directory(PROPOSAL_DIR, filename)
+    path = safe_join(PROPOSAL_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        return "File not found", 404
+    etag = file_etag(filename, path)
+    immutable = _content_name_re.match(filename) is not None
+    if PROPOSAL_SENDFILE in ('x-sendfile', 'x-accel'):
+        # the proxy sends the bytes (and answers Range requests); revalidation stays here
+        response = Response(mimetype='application/pdf')
+        if PROPOSAL_SENDFILE == 'x-accel':
+            response.headers['X-Accel-Redirect'] = PROPOSAL_ACCEL_PREFIX.rstrip('/') + '/' + quote(filename)
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000 if immutable else 0
+        return response.make_conditional(request)
+    # conditional=True answers Range, If-Range and If-None-Match against the strong ETag
+    response = send_file(os.path.abspath(path), mimetype='application/pdf', conditional=True, etag=etag,
+                         max_age=31536000 if immutable else None)
+    if immutable:
+        response.cache_control.immutable = True
+    return response
 
 @app.route('/analysis/<proposal_id>')
 def analysis(proposal_id):
     if not session.get('admin'):
         return redirect(url_for('login'))
-    prop = proposals_db.get(proposal_id)
+    prop = storage.get_proposal(proposal_id)
     if not prop:
         return "Proposal not found", 404
-    comments = comments_db.get(proposal_id, [])
-    for c in comments:
-        if 'original' not in c:
-            try:
-                detected = detect(c.get('text', ''))
-            except Exception:
-                detected = 'en'
-            c['original'] = c.get('text', '')
-            c['text'] = translate_to_english(c['original'], detected)
-
-    # --- TOP WORDS & WORDCLOUD: only from sentiment-bearing (positive or negative) comments and filtered tokens
-    sentiment_tokens = []
-    for c in comments:
-        s = analyze_sentiment(c['text'])
-        if s in ('positive', 'negative'):
-            sentiment_tokens.extend(tokenize_filtered(c['text']))
-    top_words = Counter(sentiment_tokens).most_common(5)
-    summary = ' '.join(sentiment_tokens[:50]) if sentiment_tokens else ''
-
-    # --- SENTIMENT TIMELINE, PROFESSION SENTIMENT, QUOTES, CONTROVERSIAL: use FULL comments (no extra filtering)
-    timeline_sentiments = defaultdict(lambda: {'positive':0,'neutral':0,'negative':0})
-    profession_sentiments = defaultdict(lambda: {'positive':0,'neutral':0,'negative':0})
-    phrase_counter = Counter()
-    pos = neg = neu = 0
-
-    # Use translated English text for phrase extraction where possible (fall back to original)
-    english_texts = [c['text'] for c in comments if isinstance(c.get('text'), str) and c['text'].strip()]
-
-    for c in comments:
-        s = analyze_sentiment(c['text'])
-        profession_sentiments[c['profession']][s] += 1
-        if s == 'positive':
-            pos += 1
-        elif s == 'negative':
-            neg += 1
-        else:
-            neu += 1
-        # ensure month key is consistently formatted as YYYY-MM for correct chronological sorting
-        try:
-            month_key = datetime.strptime(c['date'], "%Y-%m-%d").strftime("%Y-%m")
-        except Exception:
-            # fallback: if date is partial or malformed, try to parse year-month if present
-            try:
-                parsed = datetime.strptime(c['date'], "%Y-%m")
-                month_key = parsed.strftime("%Y-%m")
-            except Exception:
-                month_key = c['date']
-        timeline_sentiments[month_key][s] += 1
-
-        # Use translated English text for phrase extraction if available, else original
-        text_for_phrases = c.get('text') or c.get('original') or ''
-        phrase_ngrams = extract_ngrams_from_text(text_for_phrases, min_n=2, max_n=4)
-        phrase_counter.update(phrase_ngrams)
-
-    # sort months chronologically by parsing YYYY-MM keys, then format labels
-    def _parse_month_key(k):
-        try:
-            return datetime.strptime(k, "%Y-%m")
-        except Exception:
-            # try common alternatives, fallback to epoch ordering
-            try:
-                return datetime.strptime(k, "%Y-%m-%d")
-            except Exception:
-                return None
-
-    month_items = []
-    for k, v in timeline_sentiments.items():
-        dt = _parse_month_key(k)
-        month_items.append((k, v, dt))
-    # sort by datetime when available, else by original key
-    month_items.sort(key=lambda x: (x[2] is None, x[2] or x[0]))
-    timeline_ordered = {}
-    for k, v, dt in month_items:
-        if dt:
-            label = dt.strftime("%b %Y")
-        else:
-            label = k
-        timeline_ordered[label] = v
+    enqueue_pending_translations(proposal_id)
+    comments, next_cursor = comment_page(proposal_id, request.args, collapse=True, admin=True)
+    pending_count = storage.count_pending(proposal_id)
+    # Only comments whose translation has finished are part of the precomputed aggregates
+    analytics = analytics_for(proposal_id)
+    stats = analytics.snapshot()
+    sentiment_tokens = stats['sentiment_tokens']
 
     # Wordcloud generated only from sentiment_tokens (filtered)
-    wordcloud_filename = None
-    if sentiment_tokens:
-        try:
-            wc_text = ' '.join(sentiment_tokens)
-            wc = WordCloud(width=1000, height=500, background_color='white', collocations=False).generate(wc_text)
-            safe_pid = safe_filename(proposal_id)
-            fname = f"{safe_pid}_{int(datetime.now().timestamp())}.png"
-            full_path = os.path.join(WORDCLOUD_DIR, fname)
-            wc.to_file(full_path)
-            wordcloud_filename = f"wordclouds/{fname}"
-        except Exception as e:
-            print("WordCloud error:", e)
-            wordcloud_filename = None
+    wordcloud_filename, wordcloud_pending = wordcloud_for(proposal_id, sentiment_tokens)
 
     # Quote selection: pick top ngram if it is reasonable (avoid short/noisy fragments)
     quote = None
-    if phrase_counter:
-        cand = phrase_counter.most_common(10)
-        for ph, cnt in cand:
-            if is_reasonable_quote(ph):
-                quote = ph
-                break
+    for ph, cnt in stats['phrases']:
+        if is_reasonable_quote(ph):
+            quote = ph
+            break
 
-    # Controversial phrases: require minimum frequency before cross-sentiment check
-    controversial_phrases = []
-    MIN_PHRASE_FREQ = 2
-    for p, count in phrase_counter.items():
-        if count < MIN_PHRASE_FREQ:
-            continue
-        if any(analyze_sentiment(t) == 'positive' for t in english_texts if p in t) and \
-           any(analyze_sentiment(t) == 'negative' for t in english_texts if p in t):
-            controversial_phrases.append(p)
-
-    profession_sentiments = {p: dict(v) for p, v in profession_sentiments.items()}
-
-    return render_template('analysis.html',
-                           proposal=prop,
-                           summary=summary,
-                           top_words=top_words,
-                           pos=pos, neg=neg, neu=neu,
-                           timeline_sentiments=timeline_ordered,
-                           wordcloud_filename=wordcloud_filename,
-                           quote=quote,
-                           controversial_phrases=controversial_phrases,
-                           profession_sentiments=profession_sentiments,
-                           comments=comments)
+    controversial_phrases = analytics.controversial_phrases()
+
+    return stream_page('analysis.html',
+                       proposal=prop,
+                       summary=stats['summary'],
+                       top_words=stats['top_words'],
+                       pos=stats['pos'], neg=stats['neg'], neu=stats['neu'],
+                       timeline_sentiments=stats['timeline'],
+                       wordcloud_filename=wordcloud_filename,
+                       wordcloud_pending=wordcloud_pending,
+                       quote=quote,
+                       controversial_phrases=controversial_phrases,
+                       profession_sentiments=stats['professions'],
+                       pending_count=pending_count,
+                       near_duplicates=stats['near_duplicates'],
+                       comments=comments,
+                       next_cursor=next_cursor,
+                       filters=comment_filters(request.args, collapse=True, admin=True),
+                       professions=storage.list_professions(proposal_id))
+
+@app.route('/api/proposals/<proposal_id>/comments')
+def comments_api(proposal_id):
+    if not storage.get_proposal(proposal_id):
+        return jsonify({'error':'not found'}), 404
+    admin = session.get('admin', False)
+    try:
+        comments, next_cursor = comment_page(proposal_id, request.args, request.args.get('cursor'), admin=admin)
+    except ValueError:
+        return jsonify({'error':'invalid cursor'}), 400
+    fields = ('id', 'name', 'profession', 'date', 'original')
+    if admin:
+        fields += ('text', 'sentiment', 'cluster_id', 'cluster_size')
+    return jsonify({
+        'comments': [{k: c.get(k) for k in fields} for c in comments],
+        'next_cursor': next_cursor
+    })
 
 @app.route('/comment_analysis/<proposal_id>/<comment_id>')
 def comment_analysis(proposal_id, comment_id):
     if not session.get('admin'):
         return jsonify({'error':'unauthorized'}), 401
-    comments = comments_db.get(proposal_id, [])
-    comment = next((c for c in comments if c['id'] == comment_id), None)
+    comment = storage.get_comment(proposal_id, comment_id)
     if not comment:
         return jsonify({'error':'not found'}), 404
     text = comment.get('text', '') or ''
@@ -435,11 +2780,48 @@ def comment_analysis(proposal_id, comment_id):
         'translated': text
     })
 
+@app.route('/admin/translation_cache')
+def translation_cache_stats():
+    if not session.get('admin'):
+        return jsonify({'error':'unauthorized'}), 401
+    return jsonify(translation_cache.stats())
+
+# Frequent phrases across several proposals (all by default), combined from their summaries
+@app.route('/admin/top_phrases')
+def top_phrases():
+    if not session.get('admin'):
+        return jsonify({'error':'unauthorized'}), 401
+    proposal_ids = request.args.getlist('proposal') or [p['id'] for p in storage.list_proposals()]
+    analytics = []
+    for pid in proposal_ids:
+        if not storage.get_proposal(pid):
+            return jsonify({'error': f'unknown proposal {pid}'}), 404
+        analytics.append(analytics_for(pid))
+    try:
+        k = min(max(int(request.args.get('k', 20)), 1), PHRASE_TOPK_CAPACITY)
+    except ValueError:
+        k = 20
+    with ExitStack() as locks:
+        for a in analytics:
+            locks.enter_context(a._lock)
+        phrases, error_bound = PhraseSummary.combine([a.phrase_summary for a in analytics], k)
+    return jsonify({
+        'proposals': proposal_ids,
+        'phrases': [{'phrase': p, 'count': n} for p, n in phrases],
+        'error_bound': error_bound,
+    })
+
+@app.route('/metrics')
+def metrics():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return "unauthorized", 401
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/delete_comment/<proposal_id>/<comment_id>')
 def delete_comment(proposal_id, comment_id):
     if not session.get('admin'):
         return redirect(url_for('login'))
-    comments_db[proposal_id] = [c for c in comments_db.get(proposal_id, []) if c['id'] != comment_id]
+    storage.delete_comment(proposal_id, comment_id)
     return redirect(url_for('analysis', proposal_id=proposal_id))
 
 if __name__ == '__main__':
@@ -0,0 +1,371 @@
+"""Benchmarks for the eConsultation hot paths.
+
+Translation throughput on CPU (comments/second per batch size):
+
+    python benchmark.py translation --batch-sizes 1 8 32 --comments 64
+
+Sentiment backends (comments/second and agreement with the TextBlob reference):
+
+    python benchmark.py sentiment --comments 100000
+
+Worker start-up cost: `import app` time and peak RSS, optionally after one translation
+(run once with and once without TRANSLATION_SOCKET to compare in-process vs shared model):
+
+    python benchmark.py startup --translate
+
+Hot-path suite on a seeded synthetic Hindi/Marathi/English corpus, with translation
+and language detection stubbed so runs are deterministic. Writes JSON (timings and
+tracemalloc peaks per scale) and, with --compare, exits non-zero when a stage got
+slower or bigger than the saved baseline by more than --threshold:
+
+    python benchmark.py suite --scales 1000 10000 100000 --output baseline.json
+    python benchmark.py suite --scales 1000 10000 --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import date, timedelta
+
+
+def _translation_corpus(app, n):
+    # Hindi/Marathi seed comments, cycled up to n
+    texts = [c['original'] for c in app.SAMPLE_COMMENTS
+             if app.detect_language(c['original']) in app.TRANSLATED_LANGS]
+    return [texts[i % len(texts)] for i in range(n)]
+
+
+def bench_translation(batch_sizes, n_comments, threads):
+    import torch
+    import app
+    if threads:
+        torch.set_num_threads(threads)
+    corpus = _translation_corpus(app, n_comments)
+    app.translate_batch(corpus[:2], 'hi', batch_size=2)  # warm-up
+    print(f"translation: {n_comments} comments, torch threads={torch.get_num_threads()}")
+    results = {}
+    for bs in batch_sizes:
+        start = time.perf_counter()
+        app.translate_batch(corpus, 'hi', batch_size=bs)
+        elapsed = time.perf_counter() - start
+        results[bs] = n_comments / elapsed
+        print(f"  batch_size={bs:<3d} {results[bs]:8.2f} comments/s  ({elapsed:.2f}s)")
+    return results
+
+
+def bench_sentiment(n_comments):
+    import app
+    texts = [c['text'] for c in app.SAMPLE_COMMENTS if app.detect_language(c['text']) == 'en']
+    corpus = [texts[i % len(texts)] for i in range(n_comments)]
+    app.sentiment_polarities(corpus[:1], 'lexicon')  # build the lexicon table
+    report = app.sentiment_agreement_report(corpus)
+    print(f"sentiment: {n_comments} comments")
+    for name, seconds in report['seconds'].items():
+        print(f"  {name:<9s} {n_comments / seconds:10.0f} comments/s  ({seconds:.2f}s)")
+    print(f"  label agreement {report['label_agreement']:.2%}, polarity MAE {report['polarity_mae']:.3f}")
+    return report
+
+
+_STARTUP_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+result = {'import_seconds': round(time.perf_counter() - start, 3),
+          'rss_after_import_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+if sys.argv[1] == '1':
+    start = time.perf_counter()
+    app.translate_batch(['\u092f\u0939 \u090f\u0915 \u092a\u0930\u0940\u0915\u094d\u0937\u0923 \u0939\u0948\u0964'], 'hi')
+    result['first_translation_seconds'] = round(time.perf_counter() - start, 3)
+    result['rss_after_translation_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+print(json.dumps(result))
+"""
+
+
+def bench_startup(translate):
+    # fresh interpreter, so nothing is already imported or loaded
+    out = subprocess.run([sys.executable, '-c', _STARTUP_PROBE, '1' if translate else '0'],
+                         check=True, capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    print("startup:", json.dumps(result))
+    return result
+
+
+# --- Synthetic corpus ---
+_DEVANAGARI = range(0x0900, 0x0980)
+_MARATHI_MARKERS = ('आहे', 'आहेत', 'नाही', 'आणि', 'करावी', 'द्यावी')
+_CAMPAIGN_SHARE = 0.15  # copy-paste campaign comments with small edits
+_CAMPAIGNS = 5
+
+
+def script_language(text):
+    # stand-in for langdetect: Devanagari with Marathi markers is 'mr', other Devanagari 'hi'
+    if not any(ord(ch) in _DEVANAGARI for ch in text):
+        return 'en'
+    return 'mr' if any(m in text for m in _MARATHI_MARKERS) else 'hi'
+
+
+def stub_translate_batch(app, english_words):
+    # deterministic stand-in: each sentence is "translated" word by word into English
+    # words picked by hash, so length, vocabulary size and near-duplicates carry over;
+    # languages without a model pass through, like the real translate_batch
+    def translate_sentence(sent):
+        words = [english_words[zlib.crc32(w.encode('utf-8')) % len(english_words)] for w in sent.split()]
+        return ' '.join(words) + '.' if words else ''
+
+    def translate_batch(texts, lang_code, batch_size=None):
+        if app.translation_model_for(lang_code) is None:
+            return list(texts)
+        return [' '.join(filter(None, map(translate_sentence, app._sentence_split_re.split(t.strip()))))
+                for t in texts]
+    return translate_batch
+
+
+def _sentence_pools(app):
+    pools = {}
+    for c in app.SAMPLE_COMMENTS:
+        for sent in app._sentence_split_re.split(c['original'].strip()):
+            if sent:
+                pools.setdefault(script_language(c['original']), []).append(sent)
+    return pools
+
+
+def _perturb(rng, text):
+    words = text.split()
+    if len(words) > 4 and rng.random() < 0.5:
+        del words[rng.randrange(len(words))]
+    if rng.random() < 0.3:
+        words.append(str(rng.randint(1, 99)))
+    return ' '.join(words)
+
+
+# Proposals and comments in the seed data's language mix; the first proposal gets most comments
+def synthetic_corpus(app, n, seed=0, n_proposals=3):
+    rng = random.Random(seed)
+    pools = _sentence_pools(app)
+    langs = [script_language(c['original']) for c in app.SAMPLE_COMMENTS]
+    weights = [langs.count(lang) for lang in pools]
+    first_names = sorted({c['name'].split()[0] for c in app.SAMPLE_COMMENTS})
+    last_names = sorted({c['name'].split()[-1] for c in app.SAMPLE_COMMENTS})
+    professions = sorted({c['profession'] for c in app.SAMPLE_COMMENTS})
+    start, days = date(2025, 7, 1), 150
+
+    def compose(lang):
+        return ' '.join(rng.sample(pools[lang], min(rng.randint(1, 3), len(pools[lang]))))
+
+    campaigns = [compose(rng.choices(list(pools), weights)[0]) for _ in range(_CAMPAIGNS)]
+    proposals = [{'id': f'bench_{i}', 'title': f'Synthetic proposal {i}', 'filename': None,
+                  'uploaded_at': start.isoformat()} for i in range(n_proposals)]
+    proposal_weights = [0.8] + [0.2 / max(n_proposals - 1, 1)] * (n_proposals - 1)
+    comments = []
+    for i in range(n):
+        text = rng.choice(campaigns) if rng.random() < _CAMPAIGN_SHARE else compose(
+            rng.choices(list(pools), weights)[0])
+        comments.append({
+            'proposal': rng.choices(proposals, proposal_weights)[0]['id'],
+            'name': f"{rng.choice(first_names)} {rng.choice(last_names)}",
+            'profession': rng.choice(professions),
+            'comment': _perturb(rng, text),
+            'date': (start + timedelta(days=rng.randrange(days))).isoformat(),
+        })
+    return proposals, comments
+
+
+# --- Hot-path suite ---
+def _timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(times), 'min_seconds': min(times)}
+
+
+def _traced(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return {'peak_mb': round(tracemalloc.get_traced_memory()[1] / 2**20, 2)}
+    finally:
+        tracemalloc.stop()
+
+
+# Runs in a fresh interpreter per scale (see bench_suite); memory=True traces each stage
+# once instead of timing it, since tracemalloc slows allocation-heavy code
+def run_suite_scale(scale, seed, repeat, sample, memory):
+    import app
+    proposals, rows = synthetic_corpus(app, scale, seed)
+    english_words = sorted({w.strip('.,;:()\'"').lower() for c in app.SAMPLE_COMMENTS
+                            if script_language(c['original']) == 'en' for w in c['original'].split()} - {''})
+    app.translate_batch = stub_translate_batch(app, english_words)
+    app.detect_language_with_confidence = lambda text: (script_language(text), True)
+    for p in proposals:
+        app.storage.add_proposal(p)
+    main_id = proposals[0]['id']
+    paths = {}
+    for p in proposals:
+        paths[p['id']] = os.path.abspath(f"{p['id']}.jsonl")
+        with open(paths[p['id']], 'w', encoding='utf-8') as f:
+            for r in rows:
+                if r['proposal'] == p['id']:
+                    f.write(json.dumps(r, ensure_ascii=False) + '\n')
+
+    if not os.path.isdir(os.path.join(app.app.root_path, app.app.template_folder)):
+        app.app.template_folder = app.app.root_path  # templates checked out next to app.py
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin'] = True
+    state = {}
+
+    def ingest():
+        for p in proposals:
+            app.import_comments(p['id'], paths[p['id']])
+        state['comments'] = app.storage.list_comments(main_id)
+        state['ids'] = [c['id'] for c in state['comments']]
+
+    def view(url):
+        response = client.get(url)
+        response.get_data()  # drain the streamed body
+        assert response.status_code == 200, (url, response.status_code)
+
+    texts = lambda: [c['text'] for c in state['comments']]
+    rng = random.Random(seed)
+    # (name, fn, items, repeatable); items are resolved after ingest
+    stages = [
+        ('ingest', ingest, lambda: scale, False),
+        ('tokenize_filtered', lambda: [app.tokenize_filtered(t) for t in texts()], lambda: len(state['ids']), True),
+        ('extract_ngrams_from_text', lambda: [app.extract_ngrams_from_text(t) for t in texts()],
+         lambda: len(state['ids']), True),
+        ('analyze_sentiment', lambda: [app.analyze_sentiment(t) for t in texts()[:sample]],
+         lambda: min(sample, len(state['ids'])), True),
+        ('extract_suggestion_summary',
+         lambda: [app.extract_suggestion_summary(c['original'], c['text']) for c in state['comments']],
+         lambda: len(state['ids']), True),
+        ('analysis_view_cold', lambda: view(f'/analysis/{main_id}'), lambda: 1, False),
+        ('analysis_view_warm', lambda: view(f'/analysis/{main_id}'), lambda: 1, True),
+        ('comment_analysis', lambda: [view(f'/comment_analysis/{main_id}/{cid}')
+                                      for cid in rng.sample(state['ids'], min(100, len(state['ids'])))],
+         lambda: min(100, len(state['ids'])), True),
+    ]
+    results = {}
+    for name, fn, items, repeatable in stages:
+        result = _traced(fn) if memory else _timed(fn, repeat if repeatable else 1)
+        result['items'] = items()
+        if not memory:
+            result['per_item_ms'] = round(result['seconds'] * 1000 / max(result['items'], 1), 4)
+        results[name] = result
+    return results
+
+
+def _run_scale_subprocess(scale, seed, repeat, sample, memory):
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix='econsultation-bench-') as workdir:
+        env = dict(os.environ, DATA_DIR=os.path.join(workdir, 'data'), CACHE_DIR=os.path.join(workdir, 'cache'),
+                   WORDCLOUD_ASYNC='0', TRANSLATION_SOCKET='',
+                   PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+        cmd = [sys.executable, os.path.abspath(__file__), 'suite-scale', '--scale', str(scale), '--seed', str(seed),
+               '--repeat', str(repeat), '--sample', str(sample)] + (['--memory'] if memory else [])
+        proc = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        sys.exit(f"suite: scale {scale} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_suite(scales, seed, repeat, sample, memory):
+    report = {'meta': {'seed': seed, 'repeat': repeat, 'sentiment_sample': sample,
+                       'python': platform.python_version(), 'platform': platform.platform(),
+                       'sentiment_backend': os.environ.get('SENTIMENT_BACKEND', 'textblob'),
+                       'created': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'scales': {}}
+    for scale in scales:
+        results = _run_scale_subprocess(scale, seed, repeat, sample, False)
+        if memory:
+            for name, peak in _run_scale_subprocess(scale, seed, 1, sample, True).items():
+                results[name]['peak_mb'] = peak['peak_mb']
+        report['scales'][str(scale)] = results
+        print(f"suite: {scale} comments", file=sys.stderr)
+        for name, r in results.items():
+            peak = f"  peak {r['peak_mb']:8.2f} MB" if 'peak_mb' in r else ''
+            print(f"  {name:<28s} {r['seconds']:9.4f}s  {r['per_item_ms']:10.4f} ms/item{peak}", file=sys.stderr)
+    return report
+
+
+# Returns the (scale, stage, metric, baseline, current) entries that regressed
+def compare_reports(current, baseline, threshold):
+    regressions = []
+    for scale, stages in current['scales'].items():
+        for name, r in stages.items():
+            base = baseline.get('scales', {}).get(scale, {}).get(name)
+            if not base:
+                continue
+            for metric in ('seconds', 'peak_mb'):
+                if metric not in r or not base.get(metric):
+                    continue
+                ratio = r[metric] / base[metric]
+                flag = ratio > 1 + threshold
+                print(f"  {scale:>7s} {name:<28s} {metric:<8s} {base[metric]:10.4f} -> {r[metric]:10.4f} "
+                      f"({ratio - 1:+.1%}){'  REGRESSION' if flag else ''}", file=sys.stderr)
+                if flag:
+                    regressions.append((scale, name, metric, base[metric], r[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    tr = sub.add_parser('translation', help='MarianMT throughput per batch size')
+    tr.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    tr.add_argument('--comments', type=int, default=64)
+    tr.add_argument('--threads', type=int, default=0)
+    se = sub.add_parser('sentiment', help='sentiment backend throughput and agreement')
+    se.add_argument('--comments', type=int, default=100000)
+    st = sub.add_parser('startup', help='import time and peak RSS of a fresh worker')
+    st.add_argument('--translate', action='store_true', help='also run one translation')
+    su = sub.add_parser('suite', help='hot paths on a synthetic corpus, JSON output')
+    su.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000])
+    su.add_argument('--seed', type=int, default=0)
+    su.add_argument('--repeat', type=int, default=3, help='runs per repeatable stage (median is reported)')
+    su.add_argument('--sample', type=int, default=5000, help='comments scored by analyze_sentiment')
+    su.add_argument('--no-memory', dest='memory', action='store_false', help='skip the tracemalloc pass')
+    su.add_argument('--output', help='write the JSON report here instead of stdout')
+    su.add_argument('--compare', metavar='BASELINE', help='saved report to compare against')
+    su.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown/growth (default 10%%)')
+    sc = sub.add_parser('suite-scale')  # internal: one scale in a fresh interpreter
+    sc.add_argument('--scale', type=int, required=True)
+    sc.add_argument('--seed', type=int, default=0)
+    sc.add_argument('--repeat', type=int, default=3)
+    sc.add_argument('--sample', type=int, default=5000)
+    sc.add_argument('--memory', action='store_true')
+    args = parser.parse_args()
+    if args.command == 'translation':
+        bench_translation(args.batch_sizes, args.comments, args.threads)
+    elif args.command == 'sentiment':
+        bench_sentiment(args.comments)
+    elif args.command == 'startup':
+        bench_startup(args.translate)
+    elif args.command == 'suite-scale':
+        print(json.dumps(run_suite_scale(args.scale, args.seed, args.repeat, args.sample, args.memory)))
+    elif args.command == 'suite':
+        report = bench_suite(args.scales, args.seed, args.repeat, args.sample, args.memory)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+            regressions = compare_reports(report, baseline, args.threshold)
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
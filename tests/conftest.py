@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+# app.py opens its database and caches when imported; keep them out of the working tree
+_tmp = tempfile.mkdtemp(prefix='econsultation-tests-')
+os.environ['DATA_DIR'] = os.path.join(_tmp, 'data')
+os.environ['CACHE_DIR'] = os.path.join(_tmp, 'cache')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from support import PROPOSAL  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = app.SQLiteStorage(str(tmp_path / 'test.sqlite3'))
+    store.add_proposal({'id': PROPOSAL, 'title': 'Test proposal', 'filename': None, 'uploaded_at': time.time()})
+    # analytics, clustering and import go through the module-level storage
+    monkeypatch.setattr(app, 'storage', store)
+    monkeypatch.setattr(app, 'cluster_indexes', {})
+    monkeypatch.setattr(app, 'analytics_db', app.OrderedDict())
+    return store
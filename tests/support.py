@@ -0,0 +1,23 @@
+import app
+
+
+PROPOSAL = 'test_proposal'
+
+
+# rows are (id, text, date, profession); done comments are clustered and scored like seed_storage does
+def make_comments(*rows, status='done'):
+    comments = [{'id': cid, 'name': 'Tester', 'profession': profession, 'original': text, 'date': date,
+                 'translation_status': status} for cid, text, date, profession in rows]
+    if status == 'done':
+        for c in comments:
+            c.update(text=c['original'], lang='en')
+        app.cluster_comments(PROPOSAL, comments)
+        for c, features in zip(comments, app.comment_features_batch(comments)):
+            c['features'] = features
+    return comments
+
+
+def translate(comment, text=None, lang='en'):
+    comment = dict(comment, text=text or comment['original'], lang=lang, translation_status='done')
+    comment['features'] = app.comment_features_batch([comment])[0]
+    return comment
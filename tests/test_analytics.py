@@ -0,0 +1,144 @@
+import random
+from collections import Counter
+
+import numpy as np
+
+import app
+from support import PROPOSAL, make_comments
+
+POSITIVE = ['good', 'excellent', 'fair', 'helpful', 'great']
+NEGATIVE = ['bad', 'terrible', 'unfair', 'awful', 'poor']
+NEUTRAL = ['land', 'tax', 'road', 'school', 'water', 'farmers', 'clause', 'shops', 'village', 'permit']
+
+
+def exact_aggregates(analytics):
+    snapshot = analytics.snapshot()
+    keys = ('pos', 'neu', 'neg', 'sentiment_tokens', 'timeline', 'professions', 'near_duplicates')
+    return {k: snapshot[k] for k in keys}, sorted(analytics.controversial_phrases())
+
+
+def test_random_adds_and_deletes_match_a_rebuild(store):
+    rng = random.Random(2025)
+    analytics = app.ProposalAnalytics(PROPOSAL)
+    live, texts = [], []
+    for step in range(400):
+        if live and rng.random() < 0.3:
+            store.delete_comment(PROPOSAL, live.pop(rng.randrange(len(live))))
+        else:
+            if texts and rng.random() < 0.25:
+                text = rng.choice(texts)  # a copy-paste campaign: same cluster
+            else:
+                words = rng.sample(NEUTRAL, 5) + [rng.choice(rng.choice([POSITIVE, NEGATIVE, NEUTRAL]))]
+                rng.shuffle(words)
+                text = ' '.join(words)
+                texts.append(text)
+            store.add_comments(PROPOSAL, make_comments(
+                (f'c{step}', text, f'2025-{rng.randint(1, 6):02d}-10', rng.choice(['Farmer', 'Teacher', 'Trader']))))
+            live.append(f'c{step}')
+        if step % 37 == 0:
+            analytics.sync()
+    analytics.sync()
+
+    rebuilt = app.ProposalAnalytics(PROPOSAL)
+    rebuilt.sync()
+    assert exact_aggregates(analytics) == exact_aggregates(rebuilt)
+    assert sum(analytics.sentiment_counts.values()) == len(live)
+
+
+def ngram_counts(token_lists):
+    counts = Counter()
+    for tokens in token_lists:
+        for n in range(app.PHRASE_MIN_N, app.PHRASE_MAX_N + 1):
+            counts.update(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return counts
+
+
+def test_sketch_top_k_matches_exact_counts():
+    rng = np.random.default_rng(7)
+    vocab = [f'w{i}' for i in range(400)]
+    # Zipf-distributed words give a few clear heavy-hitter phrases and a long tail
+    comments = [[vocab[min(int(x), len(vocab)) - 1] for x in rng.zipf(1.6, size=12)] for _ in range(3000)]
+    summary = app.PhraseSummary(capacity=100)
+    for tokens in comments:
+        summary.update(tokens, 'neutral')
+    summary.fit()
+    exact = ngram_counts(comments)
+
+    top = summary.top(20)
+    bound = summary.error_bound()
+    for phrase, estimate in top:
+        assert exact[phrase] <= estimate <= exact[phrase] + bound
+    true_top = [p for p, _ in exact.most_common(20)]
+    # every phrase clearly above the 20th true count is reported
+    cutoff = exact[true_top[-1]] + bound
+    assert {p for p in true_top if exact[p] > cutoff} <= {p for p, _ in top}
+
+
+def test_readmitted_phrase_keeps_its_earlier_sides():
+    summary = app.PhraseSummary(capacity=2)
+    summary.update(['land', 'tax'], 'positive')
+    for i in range(6):  # enough other phrases to prune 'land tax'
+        summary.update([f'a{i}', f'b{i}'], 'neutral')
+        summary.update([f'a{i}', f'b{i}'], 'neutral')
+    assert not any(e[0] == 'land tax' for e in summary.tracked.values())
+    summary.update(['land', 'tax'], 'negative')
+    assert 'land tax' in summary.controversial(2)
+
+
+def test_folded_and_combined_sketches_never_undercount():
+    rng = random.Random(3)
+    parts = [[[f'w{rng.randrange(60)}' for _ in range(8)] for _ in range(size)] for size in (20, 400, 3000)]
+    summaries = []
+    for comments in parts:
+        summary = app.PhraseSummary()
+        for tokens in comments:
+            summary.update(tokens, 'neutral')
+        summary.fit()
+        summaries.append(summary)
+    assert len({s.counts.width for s in summaries}) == 3  # sized to their counts
+
+    exact = ngram_counts([tokens for comments in parts for tokens in comments])
+    phrases, bound = app.PhraseSummary.combine(summaries, 30)
+    for phrase, estimate in phrases:
+        assert exact[phrase] <= estimate <= exact[phrase] + bound
+
+    merged = app.PhraseSummary()
+    for summary in summaries:
+        merged.merge(summary)
+    assert merged.counts.width == min(s.counts.width for s in summaries)
+    hashes, _, _ = app.phrase_hashes([tokens for tokens in parts[2][0]])
+    for phrase, estimate in zip(hashes, merged.counts.estimate(hashes).tolist()):
+        assert estimate >= 1
+
+
+def test_sketch_grows_with_the_proposal(store, monkeypatch):
+    monkeypatch.setattr(app, 'PHRASE_SKETCH_MIN_WIDTH', 64)
+    rng = random.Random(5)
+    rows = [(f'c{i}', ' '.join(rng.sample(NEUTRAL + POSITIVE, 8)), '2025-01-10', 'Farmer') for i in range(120)]
+    store.add_comments(PROPOSAL, make_comments(*rows[:5]))
+    analytics = app.ProposalAnalytics(PROPOSAL)
+    analytics.sync()
+    start = analytics.phrase_summary.counts.width
+    assert start <= 2 * analytics.phrase_summary.counts.total  # folded to fit the few comments
+    for row in rows[5:]:
+        store.add_comments(PROPOSAL, make_comments(row))
+        analytics.sync()
+    summary = analytics.phrase_summary
+    assert summary.counts.width > start and not summary.outgrown()
+
+    rebuilt = app.ProposalAnalytics(PROPOSAL)
+    rebuilt.sync()
+    assert summary.counts.total == rebuilt.phrase_summary.counts.total
+    assert sorted(summary.top(10)) == sorted(rebuilt.phrase_summary.top(10))
+
+
+def test_analytics_cache_evicts_the_least_recently_used(store, monkeypatch):
+    monkeypatch.setattr(app, 'ANALYTICS_CACHE_PROPOSALS', 2)
+    for pid in ('p1', 'p2', 'p3'):
+        store.add_proposal({'id': pid, 'title': pid, 'filename': None, 'uploaded_at': '2025-01-01'})
+    first = app.analytics_for('p1')
+    app.analytics_for('p2')
+    app.analytics_for('p1')
+    app.analytics_for('p3')
+    assert list(app.analytics_db) == ['p1', 'p3']
+    assert app.analytics_for('p1') is first
@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+
+import app
+from support import PROPOSAL, make_comments, translate
+
+
+def test_negation_is_not_a_near_duplicate(store):
+    support = ('We support the amended land acquisition clause, it is good for farmers '
+               'and fair to landowners across the state')
+    against = ('We do not support the amended land acquisition clause, it is not good for farmers '
+               'and not fair to landowners across the state')
+    store.add_comments(PROPOSAL, make_comments(('for', support, '2025-01-05', 'Farmer')))
+    [copy, negated] = app.cluster_comments(PROPOSAL, make_comments(('copy', support + '!', '2025-01-06', 'Farmer'),
+                                                                    ('neg', against, '2025-01-06', 'Farmer'),
+                                                                    status='pending'))
+    assert copy['cluster_id'] == 'for'
+    assert negated['cluster_id'] == 'neg'
+    assert not app.translation_ready(negated)
+
+
+def test_only_translated_members_are_reused(store):
+    hindi = 'यह प्रस्ताव किसानों के लिए बहुत अच्छा है और हम इसका पूरा समर्थन करते हैं'
+    english = 'The proposal is terrible for small traders and the fees are awful'
+    [translated] = make_comments(('hi', hindi, '2025-01-05', 'Farmer'), status='pending')
+    app.cluster_comments(PROPOSAL, [translated])
+    translated = translate(translated, text='The proposal is very good for farmers and we fully support it', lang='hi')
+    store.add_comments(PROPOSAL, [translated] + make_comments(('en', english, '2025-01-05', 'Trader')))
+
+    [hindi_copy, english_copy] = app.cluster_comments(
+        PROPOSAL, make_comments(('hi-copy', hindi, '2025-01-06', 'Farmer'),
+                                ('en-copy', english, '2025-01-06', 'Trader'), status='pending'))
+    assert hindi_copy['cluster_id'] == 'hi'
+    assert hindi_copy['translation_status'] == 'done'
+    assert hindi_copy['text'] == translated['text']
+    assert hindi_copy['features']['sentiment'] == translated['features']['sentiment']
+    # an English member has nothing to reuse: the copy is scored on its own text
+    assert english_copy['cluster_id'] == 'en'
+    assert not app.translation_ready(english_copy)
+    assert 'features' not in english_copy
+
+
+def test_cluster_index_finds_clusters_across_the_tail_merge():
+    rng = random.Random(7)
+    vocab = [f'word{i}' for i in range(5000)]
+    texts = [' '.join(rng.sample(vocab, 12)) for _ in range(app.CLUSTER_TAIL_ROWS + 300)]
+    heads = [{'id': f'c{i}', 'original': text} for i, text in enumerate(texts)]
+    index = app.ClusterIndex(PROPOSAL)
+    index.assign(heads)
+    assert [c['cluster_id'] for c in heads] == [c['id'] for c in heads]
+    assert index.tail_start == app.CLUSTER_TAIL_ROWS  # the first tail was merged into the sorted keys
+
+    # copies of rows in the sorted keys and in the current tail find their cluster,
+    # both in the incrementally built index and in one bulk loaded from the same heads
+    rows = [0, 1000, app.CLUSTER_TAIL_ROWS - 1, app.CLUSTER_TAIL_ROWS, len(texts) - 1]
+    bulk = app.ClusterIndex(PROPOSAL)
+    sigs = np.frombuffer(b''.join(c['minhash'] for c in heads), dtype=np.uint64)
+    bulk.insert_many([c['id'] for c in heads], sigs.reshape(-1, app.MINHASH_PERMUTATIONS))
+    for built in (index, bulk):
+        copies = [{'id': f'd{i}', 'original': texts[i] + ' !'} for i in rows]
+        built.assign(copies)
+        assert [c['cluster_id'] for c in copies] == [f'c{i}' for i in rows]
+
+    unrelated = [{'id': 'new', 'original': ' '.join(rng.sample(vocab, 12))}]
+    index.assign(unrelated)
+    assert unrelated[0]['cluster_id'] == 'new'
+
+
+def test_deleting_a_cluster_head_hands_its_text_to_the_next_member(store):
+    text = 'The fees in this plan are terrible and the rules are awful for small shops'
+    store.add_comments(PROPOSAL, make_comments(('first', text, '2025-01-05', 'Trader'),
+                                               ('second', text, '2025-01-06', 'Trader')))
+    analytics = app.ProposalAnalytics(PROPOSAL)
+    analytics.sync()
+    before = analytics.snapshot()
+    assert before['neg'] == 2 and before['near_duplicates'] == 1
+
+    store.delete_comment(PROPOSAL, 'first')
+    analytics.sync()
+    after = analytics.snapshot()
+    assert after['neg'] == 1 and after['near_duplicates'] == 0
+    assert after['sentiment_tokens'] == before['sentiment_tokens']  # still counted once, now for 'second'
+
+    store.delete_comment(PROPOSAL, 'second')
+    analytics.sync()
+    assert not analytics.snapshot()['sentiment_tokens']
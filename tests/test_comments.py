@@ -0,0 +1,43 @@
+import app
+from support import PROPOSAL, make_comments
+
+
+def test_cursor_paging_returns_each_comment_once(store):
+    rows = [(f'c{i}', f'Comment number {i} on the plan', f'2025-01-{1 + i // 3:02d}',
+             'Teacher' if i % 2 else 'Farmer') for i in range(10)]
+    store.add_comments(PROPOSAL, make_comments(*rows))
+    everything = [c['id'] for c in store.list_comments(PROPOSAL)]
+    assert sorted(everything) == sorted(cid for cid, *_ in rows)
+
+    for filters in ({}, {'profession': 'Teacher'}):
+        expected = [c['id'] for c in store.list_comments(PROPOSAL, **filters)]
+        seen, after = [], None
+        while True:
+            page = store.list_comments(PROPOSAL, after=after, limit=3, **filters)
+            seen.extend(c['id'] for c in page)
+            if len(page) < 3:
+                break
+            after = app.decode_cursor(app.encode_cursor(page[-1]))
+        assert seen == expected
+
+
+def test_comments_api_pages_and_hides_analysis_from_visitors(store):
+    store.add_comments(PROPOSAL, make_comments(*[(f'c{i}', f'Comment number {i} on the plan', '2025-01-05', 'Teacher')
+                                                 for i in range(5)]))
+    client = app.app.test_client()
+    seen, cursor = [], None
+    while True:
+        rv = client.get(f'/api/proposals/{PROPOSAL}/comments', query_string={'limit': 2, 'cursor': cursor or ''})
+        assert rv.status_code == 200
+        seen.extend(c['id'] for c in rv.json['comments'])
+        assert all('sentiment' not in c for c in rv.json['comments'])
+        cursor = rv.json['next_cursor']
+        if cursor is None:
+            break
+    assert sorted(seen) == [f'c{i}' for i in range(5)]
+
+    assert client.get(f'/api/proposals/{PROPOSAL}/comments?cursor=garbage').status_code == 400
+    assert client.get('/api/proposals/no-such-proposal/comments').status_code == 404
+    with client.session_transaction() as s:
+        s['admin'] = True
+    assert 'sentiment' in client.get(f'/api/proposals/{PROPOSAL}/comments').json['comments'][0]
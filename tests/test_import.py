@@ -0,0 +1,49 @@
+import pytest
+
+import app
+from support import PROPOSAL
+
+
+def test_interrupted_import_resumes_after_the_last_committed_chunk(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'IMPORT_CHUNK_SIZE', 2)
+    monkeypatch.setattr(app, 'detect_language_with_confidence', lambda text: ('en', True))  # no models needed for English
+    path = tmp_path / 'comments.csv'
+    path.write_text('name,profession,date,comment\n'
+                    'A,Teacher,2025-01-01,The schools section is excellent\n'
+                    'B,Farmer,2025-01-02,Crop insurance rules are unclear\n'
+                    'C,Trader,2025-01-03,\n'
+                    'D,Citizen,2025-01-04,The fees are far too high\n'
+                    'E,Student,2025-01-05,Please extend the consultation period\n', encoding='utf-8')
+
+    record_import_chunk = store.record_import_chunk
+    calls = []
+
+    def fail_second_chunk(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError('disk full')
+        return record_import_chunk(*args, **kwargs)
+
+    monkeypatch.setattr(store, 'record_import_chunk', fail_second_chunk)
+    with pytest.raises(RuntimeError, match='disk full'):
+        app.import_comments(PROPOSAL, str(path))
+    [job] = store.list_import_jobs()
+    assert (job['status'], job['rows_done']) == ('failed', 2)
+    assert len(store.list_comments(PROPOSAL)) == 2
+
+    monkeypatch.setattr(store, 'record_import_chunk', record_import_chunk)
+    job = app.import_comments(PROPOSAL, str(path))
+    assert (job['status'], job['rows_done'], job['rows_skipped']) == ('done', 5, 1)
+    comments = store.list_comments(PROPOSAL)
+    assert sorted(c['name'] for c in comments) == ['A', 'B', 'D', 'E']
+    assert len({c['id'] for c in comments}) == 4
+
+    # a finished job is not run again
+    assert app.import_comments(PROPOSAL, str(path))['updated_at'] == job['updated_at']
+    assert len(store.list_comments(PROPOSAL)) == 4
+
+
+def test_running_import_is_not_claimed_twice(store):
+    assert store.start_import_job('job', PROPOSAL, 'a.csv', claim_timeout=60) is not None
+    assert store.start_import_job('job', PROPOSAL, 'a.csv', claim_timeout=60) is None
+    assert store.start_import_job('job', PROPOSAL, 'a.csv', claim_timeout=-1) is not None  # stale
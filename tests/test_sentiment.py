@@ -0,0 +1,12 @@
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('text', ['not good at all', 'This is not a good plan', "I don't like it, a bad idea",
+                                  'Never bad', 'The plan is good. Not bad either'])
+def test_lexicon_backend_follows_textblob_on_negations(text):
+    [lexicon] = app.sentiment_polarities([text], backend='lexicon')
+    [reference] = app.sentiment_polarities([text], backend='textblob')
+    assert lexicon == pytest.approx(reference)
+    assert app.analyze_sentiment(text, backend='lexicon') == app.analyze_sentiment(text, backend='textblob')
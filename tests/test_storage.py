@@ -0,0 +1,104 @@
+import pytest
+
+import app
+from support import PROPOSAL, make_comments, translate
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class PartialStorage(app.Storage):
+        def get_proposal(self, proposal_id):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialStorage()
+
+
+def test_claim_complete_and_changes_since_replay(store):
+    store.add_comments(PROPOSAL, make_comments(('c1', 'This is an excellent and wonderful plan', '2025-01-05', 'Teacher'),
+                                               status='pending'))
+    assert store.changes_since(PROPOSAL, 0) == []  # not ready until translated
+    assert store.count_pending(PROPOSAL) == 1
+
+    assert store.claim_for_translation('c1', claim_timeout=60)
+    assert not store.claim_for_translation('c1', claim_timeout=60)  # held by the first claim
+    assert store.pending_comments(PROPOSAL, 10, claim_timeout=60) == []
+    assert store.claim_for_translation('c1', claim_timeout=-1)  # a stale claim is taken over
+
+    comment = translate(store.get_comment(PROPOSAL, 'c1'))
+    store.complete_translations([comment])
+    store.complete_translations([comment])  # no longer queued: not logged twice
+    changes = store.changes_since(PROPOSAL, 0)
+    assert [(op, comment_id) for _, op, comment_id, _ in changes] == [('ready', 'c1')]
+    seq, _, _, logged = changes[0]
+    assert logged['features']['sentiment'] == 'positive'
+    assert store.changes_since(PROPOSAL, seq) == []
+    assert store.count_pending(PROPOSAL) == 0
+
+    # a fresh analytics object replays the whole log; syncing again changes nothing
+    analytics = app.ProposalAnalytics(PROPOSAL)
+    analytics.sync()
+    analytics.sync()
+    snapshot = analytics.snapshot()
+    assert (snapshot['pos'], snapshot['neu'], snapshot['neg']) == (1, 0, 0)
+    assert analytics.last_seq == seq
+
+
+def test_completing_a_deleted_comment_logs_nothing(store):
+    store.add_comments(PROPOSAL, make_comments(('c1', 'A comment about the plan', '2025-01-05', 'Citizen'),
+                                               status='pending'))
+    assert store.claim_for_translation('c1', claim_timeout=60)
+    comment = translate(store.get_comment(PROPOSAL, 'c1'))
+    assert store.delete_comment(PROPOSAL, 'c1')
+    store.complete_translations([comment])
+    assert store.get_comment(PROPOSAL, 'c1') is None
+    assert 'ready' not in [op for _, op, _, _ in store.changes_since(PROPOSAL, 0)]
+
+
+def test_delete_subtracts_from_analytics(store):
+    store.add_comments(PROPOSAL, make_comments(
+        ('pos', 'This is an excellent and wonderful plan', '2025-01-05', 'Teacher'),
+        ('neg', 'This is a terrible and awful plan', '2025-02-05', 'Farmer'),
+    ))
+    analytics = app.ProposalAnalytics(PROPOSAL)
+    analytics.sync()
+    before = analytics.snapshot()
+    assert (before['pos'], before['neg']) == (1, 1)
+    assert 'excellent' in before['sentiment_tokens']
+
+    assert store.delete_comment(PROPOSAL, 'pos')
+    assert not store.delete_comment(PROPOSAL, 'pos')
+    analytics.sync()
+    after = analytics.snapshot()
+    assert (after['pos'], after['neu'], after['neg']) == (0, 0, 1)
+    assert 'excellent' not in after['sentiment_tokens']
+    assert after['sentiment_tokens']['plan'] == before['sentiment_tokens']['plan'] - 1
+    assert list(after['timeline']) == ['Feb 2025']
+    assert list(after['professions']) == ['Farmer']
+
+    # the same result as building from scratch over the remaining comments
+    rebuilt = app.ProposalAnalytics(PROPOSAL)
+    rebuilt.sync()
+    assert rebuilt.snapshot()['sentiment_tokens'] == after['sentiment_tokens']
+
+
+def test_sync_replays_the_log_in_pages(store, monkeypatch):
+    store.add_comments(PROPOSAL, make_comments(*[(f'c{i}', f'Comment {i} says the plan is excellent', '2025-01-05',
+                                                  'Teacher') for i in range(7)]))
+    store.delete_comment(PROPOSAL, 'c3')
+    pages = []
+    changes_since = store.changes_since
+    monkeypatch.setattr(store, 'changes_since', lambda *args: pages.append(changes_since(*args)) or pages[-1])
+    monkeypatch.setattr(app, 'ANALYTICS_SYNC_PAGE_SIZE', 3)
+
+    analytics = app.ProposalAnalytics(PROPOSAL)
+    analytics.sync()
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert analytics.snapshot()['pos'] == 6
+    assert analytics.last_seq == pages[-1][-1][0]
+
+
+def test_seeding_twice_adds_the_sample_once(store, monkeypatch):
+    monkeypatch.setattr(store, 'list_proposals', lambda: [])  # both workers saw no proposals
+    app.seed_storage()
+    app.seed_storage()
+    assert len(store.list_comments(app.sample_id)) == len(app.SAMPLE_COMMENTS)
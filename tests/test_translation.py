@@ -0,0 +1,102 @@
+import time
+from collections import namedtuple
+
+import pytest
+
+import app
+from support import PROPOSAL, make_comments
+
+
+Candidate = namedtuple('Candidate', 'lang prob')
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = app.TranslationCache(str(tmp_path / 'translations.sqlite3'), 100, app.TRANSLATION_CACHE_NAMESPACE)
+    monkeypatch.setattr(app, 'translation_cache', cache)
+    monkeypatch.setattr(app, 'translate_batch', lambda texts, lang_code, batch_size=None: [
+        f"EN:{t}" if app.translation_model_for(lang_code) else t for t in texts])
+    return cache
+
+
+def detects(monkeypatch, *candidates):
+    monkeypatch.setattr(app, 'detect_langs', lambda text: [Candidate(*c) for c in candidates])
+
+
+def test_detection_is_deterministic():
+    text = 'शिक्षकों के लिए यह प्रस्ताव अस्पष्ट आहे.'
+    assert len({app.detect_language_with_confidence(text) for _ in range(20)}) == 1
+
+
+def test_mixed_languages_that_all_translate_use_the_top_candidate(cache, monkeypatch):
+    detects(monkeypatch, ('hi', 0.6), ('mr', 0.35), ('ne', 0.05))
+    assert app.detect_language_with_confidence('x') == ('hi', False)
+    detects(monkeypatch, ('hi', 0.6), ('en', 0.4))
+    assert app.detect_language_with_confidence('x') == (app.UNDETERMINED_LANG, False)
+    detects(monkeypatch, ('en', 0.6), ('hi', 0.4))
+    assert app.detect_language_with_confidence('x') == ('en', False)
+
+
+def test_only_confident_detections_are_cached(cache, monkeypatch):
+    detects(monkeypatch, ('hi', 0.6), ('mr', 0.4))
+    assert app.translate_texts(['guess']) == [('hi', 'EN:guess')]
+    detects(monkeypatch, ('hi', 0.6), ('en', 0.4))
+    assert app.translate_texts(['mixed']) == [(app.UNDETERMINED_LANG, 'mixed')]
+    detects(monkeypatch, ('hi', 0.99))
+    assert app.translate_texts(['sure']) == [('hi', 'EN:sure')]
+    assert cache.stats()['disk_entries'] == 1
+    assert cache.get('guess') is None and cache.get('mixed') is None
+    assert cache.get('sure') == ('hi', 'EN:sure')
+
+
+def test_cached_und_rows_are_detected_again(cache, monkeypatch):
+    cache.put('stuck', app.UNDETERMINED_LANG, 'stuck')  # written by an older release
+    cache._lru.clear()
+    detects(monkeypatch, ('hi', 0.99))
+    assert app.translate_texts(['stuck']) == [('hi', 'EN:stuck')]
+    assert cache.get('stuck') == ('hi', 'EN:stuck')
+
+
+def test_failed_translations_are_retried_with_backoff(store, cache, monkeypatch):
+    monkeypatch.setattr(app, 'TRANSLATION_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(app, 'TRANSLATION_RETRY_BACKOFF', 60)
+    detects(monkeypatch, ('hi', 0.99))
+    server = {'up': False}
+
+    def translate_batch(texts, lang_code, batch_size=None):
+        if not server['up'] and any('bad' in t for t in texts):
+            raise RuntimeError('translation server restarted')
+        return [f"EN:{t}" for t in texts]
+
+    monkeypatch.setattr(app, 'translate_batch', translate_batch)
+    store.add_comments(PROPOSAL, make_comments(('good', 'good text', '2025-01-05', 'Citizen'),
+                                               ('bad', 'bad text', '2025-01-05', 'Citizen'), status='pending'))
+
+    def run(now):
+        monkeypatch.setattr(app.time, 'time', lambda: now)
+        claimed = [c for c in store.pending_comments(PROPOSAL, 10, claim_timeout=600)
+                   if store.claim_for_translation(c['id'], claim_timeout=600)]
+        app.translate_claimed(claimed)
+        return sorted(c['id'] for c in claimed)
+
+    start = time.time()
+    assert run(start) == ['bad', 'good']  # the failing text does not hold back the rest of its batch
+    assert store.get_comment(PROPOSAL, 'good')['translation_status'] == 'done'
+    bad = store.get_comment(PROPOSAL, 'bad')
+    assert (bad['translation_status'], bad['translation_attempts']) == ('pending', 1)
+    assert store.count_pending(PROPOSAL) == 1
+
+    assert run(start + 30) == []  # backing off
+    assert run(start + 61) == ['bad']
+    assert store.get_comment(PROPOSAL, 'bad')['translation_attempts'] == 2
+    assert run(start + 61 + 119) == []  # the wait doubles
+    assert run(start + 61 + 121) == ['bad']  # third and last attempt
+    bad = store.get_comment(PROPOSAL, 'bad')
+    assert (bad['translation_status'], bad['text']) == ('failed', 'bad text')
+
+    # an error that heals before the last attempt ends in a translation
+    store.add_comments(PROPOSAL, make_comments(('later', 'bad luck', '2025-01-06', 'Citizen'), status='pending'))
+    run(start + 1000)
+    server['up'] = True
+    assert run(start + 1000 + 61) == ['later']
+    assert store.get_comment(PROPOSAL, 'later')['text'] == 'EN:bad luck'
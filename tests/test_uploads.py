@@ -0,0 +1,31 @@
+import io
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def admin():
+    client = app.app.test_client()
+    with client.session_transaction() as s:
+        s['admin'] = True
+    return client
+
+
+def test_views_raise_the_body_limit_for_their_own_request():
+    with app.app.test_request_context(method='POST'):
+        assert app.request.max_content_length == app.app.config['MAX_CONTENT_LENGTH']
+        app.request.max_content_length = 5
+        assert app.request.max_content_length == 5
+    with app.app.test_request_context(method='POST'):
+        assert app.request.max_content_length == app.app.config['MAX_CONTENT_LENGTH']
+
+
+def test_only_the_upload_routes_accept_large_bodies(admin):
+    body = b'name,comment\n' + b'A,' + b'x' * (2 * app.app.config['MAX_CONTENT_LENGTH']) + b'\n'
+    # an unknown proposal is refused only after the form was read under the import limit
+    rv = admin.post('/admin/import', data={'proposal': 'no-such-proposal', 'file': (io.BytesIO(body), 'big.csv')})
+    assert rv.status_code == 302
+    rv = admin.post('/submit_comment', data={'proposal': 'no-such-proposal', 'comment': body.decode()})
+    assert rv.status_code == 413